@@ -0,0 +1,84 @@
+import asyncio, atexit, threading, traceback
+
+# One event loop on a daemon thread for all of the process's async work, so that
+# per-loop state (Clients.loop_shared pools, semaphores, Firebase locks) lives
+# as long as the process instead of one call.
+
+
+class BackgroundLoop:
+    """
+    Long-lived asyncio loop running in its own thread. Any thread may submit
+    coroutines to it and gets a concurrent.futures.Future back.
+    """
+
+    def __init__(self, name: str = "BackendLoop"):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # ----- Lifecycle -----
+    def _run(self, ready: threading.Event):
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            try:
+                self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            except Exception:
+                traceback.print_exc()
+            self._loop.close()
+
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running loop, started on first use."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(ready,), daemon=True, name=self.name)
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def in_loop(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def stop(self, timeout: float = 5):
+        """Close the loop's pooled clients, then stop the loop and wait for its thread."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        from Backend.Clients import aclose_loop_clients
+        try:
+            asyncio.run_coroutine_threadsafe(aclose_loop_clients(), loop).result(timeout)
+        except Exception:
+            traceback.print_exc()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    # ----- Submitting -----
+    def submit(self, coro):
+        """Schedule coro on the loop; returns a concurrent.futures.Future with its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop())
+
+    def run(self, coro, timeout: float = None):
+        """Run coro on the loop and block the calling thread for its result."""
+        if self.in_loop():
+            coro.close()
+            raise RuntimeError("run() would block the backend loop; await the coroutine instead")
+        return self.submit(coro).result(timeout)
+
+
+# Shared instance used by main, app and TextToSpeech.
+backend_loop = BackgroundLoop()
+
+def submit(coro):
+    return backend_loop.submit(coro)
+
+def run(coro, timeout: float = None):
+    return backend_loop.run(coro, timeout)
+
+atexit.register(backend_loop.stop)
@@ -5,8 +5,8 @@ from pywhatkit import search, playonyt  # Import functions for Google search and
 from dotenv import dotenv_values  # Import dotenv to manage environment variables.
 from bs4 import BeautifulSoup  # Import BeautifulSoup for parsing HTML content.
 from rich import print  # Import rich for styled console output.
-from groq import Groq  # Import Groq for AI chat functionalities.
 from Backend.VisionAnalysis import analyze_media
+from Backend.Clients import groq_client  # Shared, connection-pooled API clients.
 
 import webbrowser  # Import webbrowser for opening URLs.
 import subprocess  # Import subprocess for interacting with the system.
@@ -31,8 +31,8 @@ classes = [
 # Define a user-agent for making web requests.
 useragent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Safari/537.36'
 
-# Initialize the Groq client with the API key.
-client = Groq(api_key=GroqAPIKey)
+# Use the shared, keep-alive Groq client.
+client = groq_client()
 
 # Predefined professional responses for user interactions.
 professional_responses = [
@@ -1,14 +1,18 @@
-from groq import Groq
 from dotenv import dotenv_values
+import asyncio
 import datetime
+import re
+import threading
 import traceback
 import config
 from Backend.Memory import get_memory_prompt
-import pyrebase
-from firebaseConfig import firebaseConfig
+from Backend.ContextWindow import context_window, messages_tokens
+from Backend.ResponseCache import response_cache
+from Backend.Clients import firebase_app, groq_client, async_groq_client, llm_slots
+from Backend import FirebaseAsync
 
 # Initialize Firebase
-firebase = pyrebase.initialize_app(firebaseConfig)
+firebase = firebase_app()
 db = firebase.database()
 
 # Load environment variables
@@ -16,8 +20,8 @@ env_vars = dotenv_values(".env")
 Assistantname = env_vars.get("Assistantname", "Kashi AI")
 GroqAPIKey = env_vars.get("GroqAPIKey")
 
-# Groq client
-client = Groq(api_key=GroqAPIKey)
+# Groq client (shared, pooled)
+client = groq_client()
 
 # System prompt
 System = f"""Hello, I am {config.Username}, You are a very accurate and advanced AI chatbot named {Assistantname} which also has real-time up-to-date information from the internet.
@@ -58,6 +62,30 @@ def append_global_chat(role: str, content: str):
         traceback.print_exc()
 
 
+async def get_user_chatlog_async():
+    try:
+        data = await FirebaseAsync.get(f"users/{config.FirebaseUID}/chatlog", config.FirebaseToken)
+        return data if data else []
+    except Exception:
+        traceback.print_exc()
+        return []
+
+
+async def save_user_chatlog_async(messages: list):
+    try:
+        await FirebaseAsync.set(f"users/{config.FirebaseUID}/chatlog", messages, config.FirebaseToken)
+    except Exception:
+        traceback.print_exc()
+
+
+async def append_global_chat_async(role: str, content: str):
+    try:
+        entry = {"uid": config.FirebaseUID, "username": config.Username, "role": role, "content": content}
+        await FirebaseAsync.push("global/chatlog", entry, config.FirebaseToken)
+    except Exception:
+        traceback.print_exc()
+
+
 # ---------- Utility ----------
 def RealtimeInformation():
     current_date_time = datetime.datetime.now()
@@ -79,45 +107,181 @@ def AnswerModifier(Answer: str):
     return '\n'.join(non_empty)
 
 
-# ---------- Main ChatBot ----------
-def ChatBot(Query: str):
-    """Handles a single chatbot query with Firebase-based history."""
+# ---------- Answer Generation ----------
+def LatestQuery(messages: list):
+    """The user message being answered; it picks which remembered facts go into the prompt."""
+    return messages[-1]["content"] if messages and messages[-1].get("role") == "user" else None
+
+
+def BuildPrompt(messages: list, memory: str, instructions: list = None, max_tokens: int = 1024):
+    """System prompts plus the history, trimmed to the prompt budget and to what max_tokens leaves of the window."""
+    # keep the history inside the prompt budget: last turns verbatim, older ones summarized
+    fixed = SystemChatBot + [{"role": "system", "content": memory}] + [{"role": "system", "content": RealtimeInformation()}] + (instructions or [])
+    history = context_window.fit(messages, reserved_tokens=messages_tokens(fixed), user_key=config.FirebaseUID,
+                                 completion_tokens=max_tokens)
+    return fixed + history
+
+
+def StreamAnswer(messages: list, should_stop=None, max_tokens: int = 1024, instructions: list = None):
+    """Yield text deltas of a completion for the given history as Groq sends them."""
+    prompt = BuildPrompt(messages, get_memory_prompt(config.Username, LatestQuery(messages)), instructions, max_tokens)
+
+    if should_stop and should_stop():
+        return
+
+    # request from Groq
+    completion = client.chat.completions.create(
+        model="llama3-70b-8192",
+        messages=prompt,
+        max_tokens=max_tokens,
+        temperature=0.7,
+        top_p=1,
+        stream=True,
+    )
 
     try:
-        # load chatlog
-        messages = get_user_chatlog()
+        for chunk in completion:
+            if should_stop and should_stop():
+                return
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta.replace("</s>", "")
+    finally:
+        completion.close()  # stop paying for tokens nobody will read
 
-        # append user query
-        memory_prompt = {"role": "system", "content": get_memory_prompt(config.Username)}
-        messages.append({"role": "user", "content": Query})
 
-        # also save globally
-        append_global_chat("user", Query)
+async def StreamAnswerAsync(messages: list, max_tokens: int = 1024, instructions: list = None):
+    """
+    StreamAnswer on the async Groq client. Concurrency is bounded by llm_slots(),
+    and cancelling the consumer closes the HTTP stream.
+    """
+    memory = await asyncio.to_thread(get_memory_prompt, config.Username, LatestQuery(messages))
+    prompt = BuildPrompt(messages, memory, instructions, max_tokens)
 
-        # request from Groq
-        completion = client.chat.completions.create(
+    async with llm_slots():
+        completion = await async_groq_client().chat.completions.create(
             model="llama3-70b-8192",
-            messages=SystemChatBot + [memory_prompt] + [{"role": "system", "content": RealtimeInformation()}] + messages,
-            max_tokens=1024,
+            messages=prompt,
+            max_tokens=max_tokens,
             temperature=0.7,
             top_p=1,
             stream=True,
         )
+        try:
+            async for chunk in completion:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta.replace("</s>", "")
+        finally:
+            await completion.close()
+
+
+async def GenerateAnswerAsync(messages: list, max_tokens: int = 1024, instructions: list = None):
+    Answer = ""
+    async for delta in StreamAnswerAsync(messages, max_tokens, instructions):
+        Answer += delta
+    return Answer.strip()
+
+
+def GenerateAnswer(messages: list, should_stop=None, max_tokens: int = 1024, instructions: list = None):
+    """Blocking form of StreamAnswer; returns None if should_stop() fires first."""
+    Answer = "".join(StreamAnswer(messages, should_stop, max_tokens, instructions))
+    if should_stop and should_stop():
+        return None
+    return Answer.strip()
 
-        Answer = ""
-        for chunk in completion:
-            if chunk.choices[0].delta.content:
-                Answer += chunk.choices[0].delta.content
 
-        Answer = Answer.replace("</s>", "").strip()
+def _chatlog_path():
+    return f"users/{config.FirebaseUID}/chatlog"
 
-        # append assistant response
-        messages.append({"role": "assistant", "content": Answer})
+
+def CommitExchanges(pairs: list):
+    """
+    Append (query, answer) pairs to the user's chatlog as it is now, not as it was when
+    generation started: other buckets may have committed meanwhile. Same lock as
+    RealtimeSearchEngine's commits. Then mirror them to the global chatlog.
+    """
+    with FirebaseAsync.path_lock(_chatlog_path()):
+        messages = get_user_chatlog()
+        for q, a in pairs:
+            messages += [{"role": "user", "content": q}, {"role": "assistant", "content": a}]
         save_user_chatlog(messages)
+    for q, a in pairs:
+        append_global_chat("user", q)
+        append_global_chat("assistant", a)
+
+
+async def CommitExchangesAsync(pairs: list):
+    async with FirebaseAsync.lock(_chatlog_path()):
+        messages = await get_user_chatlog_async()
+        for q, a in pairs:
+            messages += [{"role": "user", "content": q}, {"role": "assistant", "content": a}]
+        await save_user_chatlog_async(messages)
+    for q, a in pairs:
+        await append_global_chat_async("user", q)
+        await append_global_chat_async("assistant", a)
+
+
+def CommitAnswer(Query: str, Answer: str):
+    """Persist a finished exchange to the user's and the global chatlog."""
+    CommitExchanges([(Query, Answer)])
+
+
+async def CommitAnswerAsync(Query: str, Answer: str):
+    await CommitExchangesAsync([(Query, Answer)])
+
+
+# ---------- Main ChatBot ----------
+def ChatBotStream(Query: str):
+    """Yield the answer as text deltas; the exchange is saved once the stream is exhausted."""
+    # load chatlog and append user query
+    messages = get_user_chatlog()
+    messages.append({"role": "user", "content": Query})
+
+    # a near-identical question answered before skips the model, but still lands in the history
+    cached = response_cache.get(Query, config.FirebaseUID)
+    if cached is not None:
+        yield cached
+        CommitAnswer(Query, cached)
+        return
 
-        # save global
-        append_global_chat("assistant", Answer)
+    Answer = ""
+    for delta in StreamAnswer(messages):
+        Answer += delta
+        yield delta
 
+    CommitAnswer(Query, Answer.strip())
+    response_cache.put(Query, Answer.strip(), config.FirebaseUID)
+
+
+def ChatBot(Query: str):
+    """Handles a single chatbot query with Firebase-based history."""
+
+    try:
+        return AnswerModifier("".join(ChatBotStream(Query)).strip())
+
+    except Exception as e:
+        traceback.print_exc()
+        return f"Sorry, something went wrong: {e}"
+
+
+async def ChatBotAsync(Query: str):
+    """
+    ChatBot without a worker thread: async Groq and Firebase calls, so a timeout
+    (asyncio.wait_for) cancels the in-flight request instead of abandoning a thread.
+    """
+    try:
+        messages = await get_user_chatlog_async()
+        messages.append({"role": "user", "content": Query})
+
+        Answer = response_cache.get(Query, config.FirebaseUID)
+        fresh = Answer is None
+        if fresh:
+            Answer = await GenerateAnswerAsync(messages)
+
+        await CommitAnswerAsync(Query, Answer)
+        if fresh:
+            response_cache.put(Query, Answer, config.FirebaseUID)
         return AnswerModifier(Answer)
 
     except Exception as e:
@@ -125,6 +289,149 @@ def ChatBot(Query: str):
         return f"Sorry, something went wrong: {e}"
 
 
+# ---------- Batched ChatBot ----------
+BatchInstruction = """The user's next message contains several numbered questions.
+Answer every question separately and in the same order.
+Start each answer on its own line with the marker [[ANSWER n]] where n is the question number, and write nothing before the first marker."""
+
+def SplitBatchAnswer(Answer: str, count: int):
+    """Split a delimited batch reply back into one answer per question (None where missing)."""
+    answers = [None] * count
+    parts = re.split(r"\[\[ANSWER\s*(\d+)\]\]", Answer)
+    for number, text in zip(parts[1::2], parts[2::2]):
+        index = int(number) - 1
+        if 0 <= index < count and text.strip():
+            answers[index] = text.strip()
+    return answers
+
+
+def ChatBotBatch(Queries: list):
+    """
+    Answer several general sub-queries with one Groq completion, so the chatlog,
+    memory prompt and system prompt are sent once per turn instead of once per query.
+    """
+    if len(Queries) == 1:
+        return [ChatBot(Queries[0])]
+
+    try:
+        messages = get_user_chatlog()
+        answers = [response_cache.get(q, config.FirebaseUID) for q in Queries]
+        pending = [i for i, a in enumerate(answers) if a is None]
+
+        if len(pending) > 1:
+            numbered = "\n".join(f"{n}. {Queries[i]}" for n, i in enumerate(pending, 1))
+            Answer = GenerateAnswer(
+                messages + [{"role": "user", "content": numbered}],
+                max_tokens=min(1024 * len(pending), 3072),
+                instructions=[{"role": "system", "content": BatchInstruction}],
+            )
+            for i, a in zip(pending, SplitBatchAnswer(Answer, len(pending))):
+                answers[i] = a
+
+        # Whatever the model failed to delimit is answered on its own.
+        for i in pending:
+            if answers[i] is None:
+                answers[i] = GenerateAnswer(messages + [{"role": "user", "content": Queries[i]}])
+            response_cache.put(Queries[i], answers[i], config.FirebaseUID)
+
+        # Store one user/assistant pair per sub-query so the history reads naturally.
+        CommitExchanges(list(zip(Queries, answers)))
+
+        return [AnswerModifier(a) for a in answers]
+
+    except Exception as e:
+        traceback.print_exc()
+        return [f"Sorry, something went wrong: {e}" for _ in Queries]
+
+
+async def ChatBotBatchAsync(Queries: list):
+    """Async form of ChatBotBatch."""
+    if len(Queries) == 1:
+        return [await ChatBotAsync(Queries[0])]
+
+    try:
+        messages = await get_user_chatlog_async()
+        answers = [response_cache.get(q, config.FirebaseUID) for q in Queries]
+        pending = [i for i, a in enumerate(answers) if a is None]
+
+        if len(pending) > 1:
+            numbered = "\n".join(f"{n}. {Queries[i]}" for n, i in enumerate(pending, 1))
+            Answer = await GenerateAnswerAsync(
+                messages + [{"role": "user", "content": numbered}],
+                max_tokens=min(1024 * len(pending), 3072),
+                instructions=[{"role": "system", "content": BatchInstruction}],
+            )
+            for i, a in zip(pending, SplitBatchAnswer(Answer, len(pending))):
+                answers[i] = a
+
+        # Whatever the model failed to delimit is answered on its own, concurrently.
+        missing = [i for i in pending if answers[i] is None]
+        retries = await asyncio.gather(*[GenerateAnswerAsync(messages + [{"role": "user", "content": Queries[i]}]) for i in missing])
+        for i, a in zip(missing, retries):
+            answers[i] = a
+        for i in pending:
+            response_cache.put(Queries[i], answers[i], config.FirebaseUID)
+
+        await CommitExchangesAsync(list(zip(Queries, answers)))
+        return [AnswerModifier(a) for a in answers]
+
+    except Exception as e:
+        traceback.print_exc()
+        return [f"Sorry, something went wrong: {e}" for _ in Queries]
+
+
+# ---------- Speculative Answers ----------
+class SpeculativeAnswer:
+    """
+    Starts a ChatBot answer for the raw query while the DMM is still classifying.
+    Nothing is saved until result() commits it; cancel() stops the stream instead.
+    """
+
+    def __init__(self, Query: str):
+        self.query = Query
+        self.answer = None
+        self.error = None
+        self.messages = None
+        self.fresh = False
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        threading.Thread(target=self._run, daemon=True, name="SpeculativeChatBot").start()
+
+    def _run(self):
+        try:
+            self.messages = get_user_chatlog()
+            self.messages.append({"role": "user", "content": self.query})
+            self.answer = response_cache.get(self.query, config.FirebaseUID)
+            if self.answer is None:
+                self.answer = GenerateAnswer(self.messages, should_stop=self._cancelled.is_set)
+                self.fresh = True
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def result(self, timeout: float = None):
+        """Wait for the speculative answer, persist it and return it like ChatBot does."""
+        if not self._done.wait(timeout):
+            self.cancel()
+            raise TimeoutError("speculative answer timed out")
+        if self.error:
+            raise self.error
+        if self.answer is None:
+            return None
+        CommitAnswer(self.query, self.answer)
+        if self.fresh:
+            response_cache.put(self.query, self.answer, config.FirebaseUID)
+        return AnswerModifier(self.answer)
+
+
 if __name__ == "__main__":
     while True:
         user_input = input("Enter Your Question: ")
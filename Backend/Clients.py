@@ -0,0 +1,156 @@
+import asyncio, threading, weakref
+from dotenv import dotenv_values
+
+# Load environment variables
+env_vars = dotenv_values(".env")
+GroqAPIKey = env_vars.get("GroqAPIKey")
+CohereAPIKey = env_vars.get("CohereAPIKey")
+
+# Shared network policy for every backend call.
+ConnectTimeout = float(env_vars.get("ConnectTimeout") or 5)
+ReadTimeout = float(env_vars.get("ReadTimeout") or 60)
+MaxRetries = int(env_vars.get("MaxRetries") or 2)
+PoolSize = int(env_vars.get("HTTPPoolSize") or 20)
+LLMConcurrency = int(env_vars.get("LLMConcurrency") or 4)  # in-flight async LLM calls per event loop
+KeepAlive = float(env_vars.get("HTTPKeepAlive") or 120)  # seconds an idle connection is kept open
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_clients = {}
+_loop_clients = weakref.WeakKeyDictionary()  # event loop -> {name: client}
+_lock = threading.Lock()
+
+
+def _shared(name: str, factory):
+    """Build a client once per process and hand the same instance to every caller."""
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def loop_shared(name: str, factory):
+    """Like _shared, but per running event loop: async pools cannot cross loops."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _loop_clients.setdefault(loop, {})
+        if name not in clients:
+            clients[name] = factory()
+        return clients[name]
+
+
+# -------- HTTP --------
+def _httpx_client():
+    import httpx
+    return httpx.Client(
+        timeout=httpx.Timeout(ReadTimeout, connect=ConnectTimeout),
+        limits=httpx.Limits(max_connections=PoolSize * 2, max_keepalive_connections=PoolSize, keepalive_expiry=KeepAlive),
+    )
+
+def _httpx_async_client():
+    import httpx
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(ReadTimeout, connect=ConnectTimeout),
+        limits=httpx.Limits(max_connections=PoolSize * 2, max_keepalive_connections=PoolSize, keepalive_expiry=KeepAlive),
+    )
+
+def _page_client():
+    import httpx
+    return httpx.Client(
+        timeout=httpx.Timeout(ReadTimeout, connect=ConnectTimeout),
+        limits=httpx.Limits(max_connections=PoolSize * 2, max_keepalive_connections=PoolSize, keepalive_expiry=KeepAlive),
+        follow_redirects=True,
+    )
+
+def page_client():
+    """Keep-alive httpx.Client for web pages: follows redirects, never retries or waits out Retry-After."""
+    return _shared("pages", _page_client)
+
+def async_http_client():
+    """Keep-alive httpx.AsyncClient for the running event loop."""
+    return loop_shared("http", _httpx_async_client)
+
+def _requests_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=MaxRetries,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None,  # the inference APIs only take POST; retrying them is safe
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=PoolSize, pool_maxsize=PoolSize, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def http_session():
+    """Keep-alive requests.Session with pooling and retries, for plain REST calls (Hugging Face)."""
+    return _shared("http", _requests_session)
+
+def http_timeout(read: float = None):
+    """(connect, read) timeout tuple for http_session() calls."""
+    return (ConnectTimeout, read or ReadTimeout)
+
+
+# -------- LLM Providers --------
+def groq_client():
+    from groq import Groq
+    return _shared("groq", lambda: Groq(api_key=GroqAPIKey, max_retries=MaxRetries, http_client=_httpx_client()))
+
+def async_groq_client():
+    from groq import AsyncGroq
+    return loop_shared("groq", lambda: AsyncGroq(api_key=GroqAPIKey, max_retries=MaxRetries, http_client=_httpx_async_client()))
+
+def llm_slots():
+    """Semaphore bounding concurrent async LLM requests on the running loop."""
+    return loop_shared("llm_slots", lambda: asyncio.Semaphore(LLMConcurrency))
+
+def cohere_client():
+    import cohere
+    return _shared("cohere", lambda: cohere.Client(api_key=CohereAPIKey, timeout=ReadTimeout, httpx_client=_httpx_client()))
+
+
+# -------- Firebase --------
+def firebase_app():
+    """The one pyrebase app; its auth and database share a single requests session."""
+    import pyrebase
+    from firebaseConfig import firebaseConfig
+    return _shared("firebase", lambda: pyrebase.initialize_app(firebaseConfig))
+
+
+def close_all():
+    """Release pooled connections, e.g. on shutdown."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        close = getattr(client, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+
+
+async def aclose_loop_clients():
+    """Close the async clients held for the running loop, e.g. before the loop stops."""
+    with _lock:
+        clients = list(_loop_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        close = getattr(client, "aclose", None) or getattr(client, "close", None)
+        if callable(close):
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                pass
@@ -0,0 +1,189 @@
+import os, re, json, threading, traceback
+from dotenv import dotenv_values
+
+# Load environment variables
+env_vars = dotenv_values(".env")
+
+# llama3-70b-8192 has an 8192 token window shared by the prompt and the completion.
+ContextWindowTokens = int(env_vars.get("ContextWindowTokens") or 8192)
+PromptTokenBudget = int(env_vars.get("PromptTokenBudget") or 6000)
+KeepTurns = int(env_vars.get("ContextKeepTurns") or 6)
+SummaryRefreshEvery = int(env_vars.get("ContextSummaryRefresh") or 8)
+SummaryModel = "llama3-8b-8192"
+
+# -------- Paths --------
+def _data_dir():
+    d = os.path.join(os.getcwd(), "Data")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def _summary_path():
+    return os.path.join(_data_dir(), "ContextSummary.json")
+
+
+# -------- Token Counting --------
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+def count_tokens(text: str) -> int:
+    """Approximate BPE token count: the larger of word/punctuation pieces and chars/4."""
+    text = str(text or "")
+    return max(len(_TOKEN_RE.findall(text)), (len(text) + 3) // 4)
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message.get("content", "")) + 4  # role and framing overhead
+
+def messages_tokens(messages: list) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+def truncate_message(message: dict, tokens: int) -> dict:
+    """Copy of message with its content cut to the longest prefix that fits in tokens."""
+    content = str(message.get("content", ""))
+    lo, hi = 0, len(content)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(content[:mid]) + 4 <= tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return dict(message, content=content[:lo])
+
+
+# -------- Summarizer --------
+def summarize_turns(summary: str, turns: list) -> str:
+    """Fold older turns into the running summary with a small, fast model."""
+    from Backend.Clients import groq_client
+
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in turns)
+    completion = groq_client().chat.completions.create(
+        model=SummaryModel,
+        messages=[
+            {"role": "system", "content": "You maintain a compact memory of a conversation between a user and an assistant. "
+                                          "Merge the existing summary with the new turns. Keep names, facts, preferences and open questions; "
+                                          "drop small talk. Reply with the updated summary only, at most 200 words."},
+            {"role": "user", "content": f"Existing summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"},
+        ],
+        max_tokens=400,
+        temperature=0.3,
+    )
+    return completion.choices[0].message.content.strip()
+
+
+# -------- Context Window --------
+class ContextWindow:
+    """
+    Keeps the last K turns verbatim and folds everything older into a rolling
+    summary that is refreshed in the background. fit() never returns more than
+    the configured prompt budget minus whatever the caller reserves, nor more than
+    the model window leaves once the completion has its max_tokens; a new message
+    too long for that on its own is cut. The reserved part itself is the caller's:
+    fit() cannot shorten it, and a reservation past the budget still overflows.
+    """
+
+    def __init__(self, budget: int = PromptTokenBudget, keep_turns: int = KeepTurns,
+                 refresh_every: int = SummaryRefreshEvery, summarize=summarize_turns, path: str = None,
+                 window: int = ContextWindowTokens):
+        self.budget = budget
+        self.window = window
+        self.keep_turns = keep_turns
+        self.refresh_every = refresh_every
+        self.summarize = summarize
+        self.path = path or _summary_path()
+        self.summaries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    # ----- Persistence -----
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.summaries = json.load(f)
+        except Exception:
+            traceback.print_exc()
+            self.summaries = {}
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.summaries, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception:
+            traceback.print_exc()
+
+    # ----- Summary Refresh -----
+    def _refresh(self, user_key: str, older: list):
+        try:
+            with self._lock:
+                entry = dict(self.summaries.get(user_key) or {"summary": "", "covered": 0})
+            new_turns = older[entry["covered"]:]
+            if not new_turns:
+                return
+            summary = self.summarize(entry["summary"], new_turns)
+            with self._lock:
+                self.summaries[user_key] = {"summary": summary, "covered": len(older)}
+                self._save()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                self._refreshing.discard(user_key)
+
+    def _maybe_refresh(self, user_key: str, older: list, covered: int):
+        if len(older) - covered < self.refresh_every:
+            return
+        with self._lock:
+            if user_key in self._refreshing:
+                return
+            self._refreshing.add(user_key)
+        threading.Thread(target=self._refresh, args=(user_key, list(older)), daemon=True, name="ContextSummary").start()
+
+    # ----- Fitting -----
+    def fit(self, messages: list, reserved_tokens: int = 0, user_key: str = None, completion_tokens: int = 0) -> list:
+        """
+        Return the history to send: [summary] + uncovered older turns that fit + last K turns.
+        completion_tokens is the request's max_tokens; the prompt must leave it room in the window.
+        """
+        budget = max(0, min(self.budget, self.window - completion_tokens) - reserved_tokens)
+        keep = self.keep_turns * 2 + 1  # K user/assistant pairs plus the new user message
+        recent = list(messages[-keep:])
+        older = list(messages[:-keep]) if len(messages) > keep else []
+
+        summary, covered = "", 0
+        if user_key and older:
+            with self._lock:
+                entry = self.summaries.get(user_key)
+            # A chatlog that was cleared or shortened makes the stored summary meaningless.
+            if entry and entry["covered"] <= len(older):
+                summary, covered = entry["summary"], entry["covered"]
+            self._maybe_refresh(user_key, older, covered)
+
+        summary_msg = [{"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}] if summary else []
+
+        # Never drop the new user message; drop the oldest verbatim turns first.
+        trimmed = False
+        while len(recent) > 1 and messages_tokens(summary_msg + recent) > budget:
+            recent.pop(0)
+            trimmed = True
+        if messages_tokens(summary_msg + recent) > budget:
+            summary_msg = []
+        if recent and messages_tokens(recent) > budget:
+            recent = [truncate_message(recent[-1], budget)]  # only the new message is left and it is too long
+            trimmed = True
+
+        # Spend what is left on older turns the summary doesn't cover yet, newest first.
+        room = budget - messages_tokens(summary_msg + recent)
+        bridge = []
+        for m in ([] if trimmed else reversed(older[covered:])):
+            cost = message_tokens(m)
+            if cost > room:
+                break
+            bridge.insert(0, m)
+            room -= cost
+
+        return summary_msg + bridge + recent
+
+
+# Shared instance for ChatBot and RealtimeSearchEngine.
+context_window = ContextWindow()
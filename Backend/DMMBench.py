@@ -0,0 +1,237 @@
+import os, sys, json, time, atexit, argparse, tempfile
+from collections import Counter
+
+import Backend.Model as Model
+from Backend.IntentMatcher import match_intent
+from Backend.IntentClassifier import classify
+from Backend.DecisionCache import DecisionCache, fingerprint
+
+# -------- Corpus --------
+# One JSON object per line:
+#   {"query": "open chrome and tell me about gandhi",
+#    "expected": ["open chrome", "general tell me about gandhi"],
+#    "recorded": {"<config fingerprint>": {"text": "<raw model reply>", "latency": 1.42}}}
+# 'recorded' is filled in by running the remote backend with --record, after which
+# the same configuration can be replayed offline with the 'recorded' backend.
+# A row without a recording for the configuration counts as a miss, never as skipped.
+
+def corpus_path():
+    return os.path.join(os.getcwd(), "Data", "DMMCorpus.jsonl")
+
+def load_corpus(path: str):
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rows.append(json.loads(line))
+    return rows
+
+def save_corpus(path: str, rows: list):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+# -------- DMM Configuration --------
+class DMMConfig:
+    """The knobs being evaluated: model, temperature, preamble and few-shots."""
+
+    def __init__(self, model=None, temperature=0.7, preamble_text=None, history=None, cache_seed=None):
+        self.model = model or Model.DMMModel
+        self.temperature = temperature
+        self.preamble = preamble_text or Model.preamble
+        self.history = Model.ChatHistory if history is None else history
+        self.cache = bench_cache(self.key, cache_seed)
+
+    @property
+    def key(self):
+        return fingerprint(self.model, self.temperature, self.preamble, self.history)
+
+    def prompt_tokens(self, query: str):
+        text = self.preamble + "".join(turn["message"] for turn in self.history) + query
+        return estimate_tokens(text)
+
+
+def bench_cache(namespace: str, seed: str = None):
+    """
+    A DecisionCache in a temporary file, so a run neither reads nor pollutes the
+    live Data/DecisionCache.json. seed optionally names a cache file to start from.
+    """
+    fd, path = tempfile.mkstemp(prefix="DMMBenchCache-", suffix=".json")
+    entries = []
+    if seed:
+        with open(seed, "r", encoding="utf-8") as f:
+            entries = json.load(f).get("entries", [])
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"namespace": namespace, "entries": entries}, f, ensure_ascii=False)
+    atexit.register(lambda: os.path.exists(path) and os.remove(path))
+    return DecisionCache(namespace=namespace, path=path)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English)."""
+    return max(1, round(len(text) / 4))
+
+
+# -------- Backends --------
+# Each backend takes (row, config) and returns (decisions, latency_seconds, prompt_tokens);
+# prompt_tokens is 0 when no remote prompt was sent.
+def remote_backend(row, config: DMMConfig):
+    start = time.perf_counter()
+    text = ""
+    for event in Model.OpenDMMStream(row["query"], model=config.model, temperature=config.temperature,
+                                     preamble_text=config.preamble, history=config.history):
+        if event.event_type == "text-generation":
+            text += event.text
+    latency = time.perf_counter() - start
+    row.setdefault("recorded", {})[config.key] = {"text": text, "latency": latency}
+    return Model.ParseDMMText(text), latency, config.prompt_tokens(row["query"])
+
+def recorded_backend(row, config: DMMConfig):
+    recording = row.get("recorded", {}).get(config.key)
+    if recording is None:
+        return None, None, 0  # not recorded for this configuration
+    return Model.ParseDMMText(recording["text"]), recording["latency"], config.prompt_tokens(row["query"])
+
+def fastpath_backend(row, config: DMMConfig):
+    start = time.perf_counter()
+    decisions = match_intent(row["query"])
+    return decisions or [], time.perf_counter() - start, 0
+
+def local_backend(row, config: DMMConfig):
+    start = time.perf_counter()
+    decisions = classify(row["query"])
+    return decisions or [], time.perf_counter() - start, 0
+
+def cached_backend(row, config: DMMConfig):
+    start = time.perf_counter()
+    decisions = config.cache.get(row["query"])
+    return decisions or [], time.perf_counter() - start, 0
+
+def tiered_backend(row, config: DMMConfig):
+    """
+    Production order (fast path, cache, local model) with the recorded DMM as the
+    last tier; its decisions go into the bench cache as FirstLayerDMM's would.
+    """
+    for tier in (fastpath_backend, cached_backend, local_backend):
+        decisions, latency, tokens = tier(row, config)
+        if decisions:
+            return decisions, latency, tokens
+    decisions, latency, tokens = recorded_backend(row, config)
+    if decisions:
+        config.cache.put(row["query"], decisions)
+    return decisions, latency, tokens
+
+BACKENDS = {
+    "remote": remote_backend,
+    "recorded": recorded_backend,
+    "fastpath": fastpath_backend,
+    "local": local_backend,
+    "cached": cached_backend,
+    "tiered": tiered_backend,
+}
+
+
+# -------- Metrics --------
+def _category(decision: str):
+    func, _ = Model.SplitDecision(decision)
+    return func or "unknown"
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def evaluate(rows, backend, config: DMMConfig):
+    tp, fp, fn = Counter(), Counter(), Counter()
+    latencies, tokens = [], []
+    exact = answered = unrecorded = 0
+
+    for row in rows:
+        decisions, latency, prompt_tokens = backend(row, config)
+        if decisions is None:
+            unrecorded += 1  # scored as a miss: every expected decision goes unanswered
+            decisions = []
+        expected = Counter(_category(d) for d in row["expected"])
+        predicted = Counter(_category(d) for d in decisions)
+        for cat in set(expected) | set(predicted):
+            hit = min(expected[cat], predicted[cat])
+            tp[cat] += hit
+            fp[cat] += predicted[cat] - hit
+            fn[cat] += expected[cat] - hit
+        answered += bool(decisions)
+        exact += [d.lower().strip(" .?") for d in decisions] == [d.lower().strip(" .?") for d in row["expected"]]
+        if latency is not None:
+            latencies.append(latency * 1000)
+            tokens.append(prompt_tokens)
+
+    per_category = {}
+    for cat in sorted(set(tp) | set(fp) | set(fn)):
+        p = tp[cat] / (tp[cat] + fp[cat]) if tp[cat] + fp[cat] else 0.0
+        r = tp[cat] / (tp[cat] + fn[cat]) if tp[cat] + fn[cat] else 0.0
+        per_category[cat] = {"precision": round(p, 3), "recall": round(r, 3), "support": tp[cat] + fn[cat]}
+
+    evaluated = len(rows)
+    return {
+        "evaluated": evaluated,
+        "unrecorded": unrecorded,
+        "coverage": round(answered / evaluated, 3) if evaluated else 0.0,
+        "exact_match": round(exact / evaluated, 3) if evaluated else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "prompt_tokens_avg": round(sum(tokens) / len(tokens)) if tokens else 0,
+        "per_category": per_category,
+    }
+
+
+def print_report(name, result):
+    print(f"\n=== {name} ===")
+    print(f"evaluated {result['evaluated']} ({result['unrecorded']} unrecorded, scored as misses), coverage {result['coverage']}, "
+          f"exact match {result['exact_match']}")
+    print(f"latency p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, prompt ~{result['prompt_tokens_avg']} tokens")
+    print(f"{'category':<16}{'precision':>10}{'recall':>10}{'support':>10}")
+    for cat, m in result["per_category"].items():
+        print(f"{cat:<16}{m['precision']:>10}{m['recall']:>10}{m['support']:>10}")
+
+
+# -------- CLI --------
+# python -m Backend.DMMBench --backends recorded,fastpath,tiered
+# python -m Backend.DMMBench --backends remote --record --temperature 0.2
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a labeled query corpus against DMM backends.")
+    parser.add_argument("--corpus", default=corpus_path())
+    parser.add_argument("--backends", default="recorded,fastpath,local,tiered")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--preamble", help="file with an alternative preamble")
+    parser.add_argument("--history", help="JSON file with alternative few-shot ChatHistory")
+    parser.add_argument("--record", action="store_true", help="save remote replies into the corpus for offline replay")
+    parser.add_argument("--cache", help="DecisionCache file to copy as the starting state of the bench cache")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    preamble_text = open(args.preamble, encoding="utf-8").read() if args.preamble else None
+    history = json.load(open(args.history, encoding="utf-8")) if args.history else None
+    config = DMMConfig(args.model, args.temperature, preamble_text, history, args.cache)
+    rows = load_corpus(args.corpus)
+
+    results = {}
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        if name not in BACKENDS:
+            print(f"Unknown backend '{name}', choose from: {', '.join(BACKENDS)}")
+            sys.exit(1)
+        results[name] = evaluate(rows, BACKENDS[name], config)
+
+    if args.record and "remote" in results:
+        save_corpus(args.corpus, rows)
+
+    if args.json:
+        print(json.dumps({"config": config.key, "results": results}, indent=2))
+    else:
+        print(f"config {config.key}: model={config.model} temperature={config.temperature}")
+        for name, result in results.items():
+            print_report(name, result)
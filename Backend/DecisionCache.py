@@ -0,0 +1,117 @@
+import os, re, json, time, hashlib, threading, traceback
+from collections import OrderedDict
+
+# -------- Paths --------
+def _data_dir():
+    d = os.path.join(os.getcwd(), "Data")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def _cache_path():
+    return os.path.join(_data_dir(), "DecisionCache.json")
+
+
+def normalize_query(query: str) -> str:
+    """Key used for the cache: lowercase, single spaces, no edge punctuation."""
+    q = str(query or "").lower().strip()
+    q = re.sub(r"\s+", " ", q)
+    return q.strip(" .!?,")
+
+
+def fingerprint(*parts) -> str:
+    """Stable hash of everything that shapes the DMM's answer (preamble, funcs, few-shots)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+# -------- Decision Cache --------
+class DecisionCache:
+    """
+    LRU + TTL cache of normalized query -> filtered decision list, persisted to
+    Data/DecisionCache.json. The whole cache is dropped when the namespace
+    (the prompt fingerprint) changes.
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 2000, ttl: float = 7 * 24 * 3600, path: str = None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path or _cache_path()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    # ----- Persistence -----
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("namespace") != self.namespace:
+                return  # prompt changed, old decisions are stale
+            now = time.time()
+            for key, entry in data.get("entries", []):
+                if now - entry["ts"] < self.ttl:
+                    self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        except Exception:
+            traceback.print_exc()
+            self.entries = OrderedDict()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"namespace": self.namespace, "entries": list(self.entries.items())}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception:
+            traceback.print_exc()
+
+    # ----- Cache API -----
+    def get(self, query: str):
+        key = normalize_query(query)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry["ts"] >= self.ttl:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return list(entry["decisions"])
+
+    def peek(self, query: str) -> bool:
+        """True if get() would hit; touches neither the counters nor the LRU order."""
+        with self._lock:
+            entry = self.entries.get(normalize_query(query))
+            return entry is not None and time.time() - entry["ts"] < self.ttl
+
+    def put(self, query: str, decisions: list):
+        key = normalize_query(query)
+        if not key or not decisions:
+            return
+        with self._lock:
+            self.entries[key] = {"decisions": list(decisions), "ts": time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, namespace: str = None):
+        """Drop every entry; optionally switch to a new prompt fingerprint."""
+        with self._lock:
+            if namespace:
+                self.namespace = namespace
+            self.entries.clear()
+            self._save()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses, "namespace": self.namespace}
@@ -0,0 +1,90 @@
+import time, queue, threading, traceback
+from collections import defaultdict, namedtuple
+
+# -------- Topics --------
+# Each topic has a type its values are coerced to on publish.
+STATUS = "status"            # assistant status line, e.g. "Listening..."
+RESPONSE = "response"        # text for the chat screen
+MIC = "mic"                  # microphone on/off
+USER_QUERY = "user_query"    # text typed into the GUI, handed to exactly one consumer
+
+def _as_bool(value) -> bool:
+    return value if isinstance(value, bool) else str(value).strip().lower() == "true"
+
+TOPICS = {STATUS: str, RESPONSE: str, MIC: _as_bool, USER_QUERY: str}
+QUEUED = {USER_QUERY}
+
+Event = namedtuple("Event", "topic value ts")
+
+
+# -------- Event Bus --------
+class EventBus:
+    """
+    In-process publish/subscribe between the backend threads and the GUI.
+    Keeps the last value of every topic, calls subscribers on the publishing
+    thread, and queues user queries so each is taken by one consumer only.
+    """
+
+    def __init__(self, defaults: dict = None):
+        self._lock = threading.Lock()
+        self._latest = {topic: TOPICS[topic](value) for topic, value in (defaults or {}).items()}
+        self._subscribers = defaultdict(list)                # topic -> [callback(event)]
+        self._queues = {topic: queue.Queue() for topic in QUEUED}
+
+    def publish(self, topic: str, value):
+        if topic not in TOPICS:
+            raise ValueError(f"Unknown topic: {topic}")
+        event = Event(topic, TOPICS[topic](value), time.time())
+        with self._lock:
+            self._latest[topic] = event.value
+            subscribers = list(self._subscribers[topic])
+        if topic in self._queues:
+            self._queues[topic].put(event)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception:
+                traceback.print_exc()  # one broken subscriber must not starve the others
+        return event
+
+    def subscribe(self, topic: str, callback):
+        """Call callback(event) for every later event on topic; returns a function that unsubscribes."""
+        if topic not in TOPICS:
+            raise ValueError(f"Unknown topic: {topic}")
+        with self._lock:
+            self._subscribers[topic].append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers[topic]:
+                    self._subscribers[topic].remove(callback)
+        return unsubscribe
+
+    def latest(self, topic: str, default=None):
+        with self._lock:
+            return self._latest.get(topic, default)
+
+    def take(self, topic: str, timeout: float = None):
+        """
+        Next queued value of topic, removed so no other consumer sees it. Blocks up to
+        timeout seconds (forever for None, not at all for 0) and returns None if nothing came.
+        """
+        try:
+            if timeout == 0:
+                return self._queues[topic].get_nowait().value
+            return self._queues[topic].get(timeout=timeout).value
+        except queue.Empty:
+            return None
+
+    def drain(self, topic: str):
+        """Drop every value of topic still waiting to be taken."""
+        pending = self._queues[topic]
+        while True:
+            try:
+                pending.get_nowait()
+            except queue.Empty:
+                return
+
+
+# Shared instance: the GUI and the backend threads publish and listen here.
+bus = EventBus({STATUS: "Available...", MIC: False, RESPONSE: ""})
@@ -0,0 +1,119 @@
+import re, math
+from collections import defaultdict
+
+STOPWORDS = {
+    "a", "an", "the", "is", "am", "are", "was", "were", "be", "of", "to", "in", "on", "for", "and", "or",
+    "i", "me", "my", "you", "your", "it", "that", "this", "what", "who", "how", "do", "does", "did",
+}
+
+
+def _key(text: str) -> str:
+    return " ".join(re.findall(r"\w+", str(text).lower()))
+
+def _words(text: str):
+    return [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in re.findall(r"\w+", str(text).lower())]
+
+def _trigrams(text: str):
+    grams = set()
+    for w in _key(text).split():
+        padded = f" {w} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# -------- Fact Index --------
+class FactIndex:
+    """
+    Facts in insertion order with a word and a trigram inverted index: O(1) dedupe,
+    exact and fuzzy lookup for forgetting, and relevance ranking for the prompt.
+    """
+
+    def __init__(self, facts=()):
+        self.facts = {}                    # normalized key -> fact text, oldest first
+        self.words = defaultdict(set)      # word -> keys
+        self.grams = defaultdict(set)      # trigram -> keys
+        for fact in facts:
+            self.add(fact)
+
+    def __len__(self):
+        return len(self.facts)
+
+    def __contains__(self, text):
+        return _key(text) in self.facts
+
+    def get(self, text: str):
+        """The stored fact equal to text up to case and punctuation, or None."""
+        return self.facts.get(_key(text))
+
+    def list(self):
+        return list(self.facts.values())
+
+    # ----- Mutation -----
+    def add(self, text: str) -> bool:
+        key = _key(text)
+        if not key or key in self.facts:
+            return False
+        self.facts[key] = str(text).strip()
+        for w in set(_words(text)):
+            self.words[w].add(key)
+        for g in _trigrams(text):
+            self.grams[g].add(key)
+        return True
+
+    def remove(self, text: str) -> bool:
+        key = _key(text)
+        fact = self.facts.pop(key, None)
+        if fact is None:
+            return False
+        for index, terms in ((self.words, set(_words(fact))), (self.grams, _trigrams(fact))):
+            for t in terms:
+                index[t].discard(key)
+                if not index[t]:
+                    del index[t]
+        return True
+
+    # ----- Lookup -----
+    def containing(self, text: str):
+        """Facts containing text (case-insensitive), found through the word index."""
+        words = set(_words(text))
+        if not words:
+            return []
+        candidates = set.intersection(*(self.words.get(w, set()) for w in words))
+        needle = str(text).lower().strip()
+        return [self.facts[k] for k in candidates if needle in self.facts[k].lower()]
+
+    def closest(self, text: str, threshold: float = 0.75):
+        """
+        The fact that best contains text allowing for typos: the share of the text's
+        trigrams found in the fact, ties going to the shorter fact.
+        """
+        grams = _trigrams(text)
+        if not grams:
+            return None
+        overlap = defaultdict(int)
+        for g in grams:
+            for key in self.grams.get(g, ()):
+                overlap[key] += 1
+        best, best_score = None, (0.0, 0.0)
+        for key, shared in overlap.items():
+            score = (shared / len(grams), shared / len(grams | _trigrams(self.facts[key])))
+            if score > best_score:
+                best, best_score = key, score
+        return self.facts[best] if best and best_score[0] >= threshold else None
+
+    def search(self, query: str, k: int = 8):
+        """Up to k (score, fact) pairs ranked by IDF-weighted word overlap with the query."""
+        n = len(self.facts) or 1
+        scores = defaultdict(float)
+        for w in set(_words(query)) - STOPWORDS:
+            postings = self.words.get(w)
+            if postings:
+                idf = math.log(1 + n / len(postings))
+                for key in postings:
+                    scores[key] += idf
+        order = {key: i for i, key in enumerate(self.facts)}
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -order[item[0]]))
+        return [(score, self.facts[key]) for key, score in ranked[:k]]
+
+    def recent(self, k: int):
+        return list(self.facts.values())[-k:][::-1] if k > 0 else []
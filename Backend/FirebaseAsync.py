@@ -0,0 +1,60 @@
+import json, asyncio, contextlib, threading
+from firebaseConfig import firebaseConfig
+from Backend.Clients import async_http_client
+
+# Async counterpart of pyrebase's database(): the same Realtime Database REST calls
+# (GET / PUT / POST on <path>.json?auth=<token>) over the pooled httpx.AsyncClient.
+DatabaseURL = firebaseConfig["databaseURL"].rstrip("/")
+
+
+def _url(path: str) -> str:
+    return f"{DatabaseURL}/{path.strip('/')}.json"
+
+def _params(token: str = None):
+    return {"auth": token} if token else None
+
+
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+def path_lock(path: str) -> threading.Lock:
+    """
+    Process-wide lock for read-modify-write sequences on path. Blocking writers hold it
+    directly; coroutines go through lock(), so both kinds of writer exclude each other.
+    """
+    with _path_locks_guard:
+        return _path_locks.setdefault(path.strip("/"), threading.Lock())
+
+
+@contextlib.asynccontextmanager
+async def lock(path: str):
+    """path_lock(path) for coroutines, acquired without blocking the event loop."""
+    held = path_lock(path)
+    if not held.acquire(blocking=False):
+        acquiring = asyncio.ensure_future(asyncio.to_thread(held.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # the worker thread still gets the lock eventually; hand it straight back
+            acquiring.add_done_callback(lambda f: f.cancelled() or f.exception() or held.release())
+            raise
+    try:
+        yield
+    finally:
+        held.release()
+
+
+async def get(path: str, token: str = None):
+    response = await async_http_client().get(_url(path), params=_params(token))
+    response.raise_for_status()
+    return response.json()
+
+async def set(path: str, value, token: str = None):
+    response = await async_http_client().put(_url(path), params=_params(token), content=json.dumps(value))
+    response.raise_for_status()
+    return response.json()
+
+async def push(path: str, value, token: str = None):
+    response = await async_http_client().post(_url(path), params=_params(token), content=json.dumps(value))
+    response.raise_for_status()
+    return response.json()
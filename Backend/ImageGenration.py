@@ -1,9 +1,9 @@
-import requests
 from PIL import Image
 from io import BytesIO
 from dotenv import get_key
 import os
 from time import sleep
+from Backend.Clients import http_session, http_timeout
 
 
 
@@ -38,7 +38,7 @@ def generate_image(prompt: str, index: int = 1):
         }
     }
 
-    response = requests.post(API_URL, headers=HEADERS, json=data)
+    response = http_session().post(API_URL, headers=HEADERS, json=data, timeout=http_timeout(180))
     
     if response.status_code == 200:
         image = Image.open(BytesIO(response.content))
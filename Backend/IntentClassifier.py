@@ -0,0 +1,310 @@
+import os, re, sys, json, math, time, zlib, threading, traceback
+from collections import Counter, defaultdict
+from datetime import datetime
+
+# -------- Paths --------
+MODEL_VERSION = 2
+
+def _data_dir():
+    d = os.path.join(os.getcwd(), "Data")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def model_path(version: int = MODEL_VERSION):
+    return os.path.join(_data_dir(), f"IntentClassifier.v{version}.json")
+
+def log_path():
+    return os.path.join(_data_dir(), "DMMLog.jsonl")
+
+# Only these labels are answered locally: their argument is the query itself.
+# Everything else (open x, play y, compound requests) still needs the remote DMM.
+ANSWERABLE = {"general", "realtime"}
+DEFAULT_THRESHOLD = 0.9
+TARGET_PRECISION = 0.98   # the tuned threshold is the lowest that keeps calibration-split precision at this level
+MIN_CALIBRATION = 30      # answered calibration samples needed before any threshold is trusted
+MIN_THRESHOLD = 0.5       # a local answer must at least be the likely one
+NEVER = 2.0               # a threshold above any confidence: always ask the remote DMM
+
+# "open spotify and tell me a joke" is two decisions; the local model only ever returns one.
+CLAUSE_SEPARATORS = re.compile(r"[,;&]|\b(and|then|also|plus|after that|as well as|by the way)\b", re.IGNORECASE)
+
+
+# -------- Features --------
+def _normalize(text: str) -> str:
+    text = str(text or "").lower()
+    text = re.sub(r"[^\w\s']", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def features(text: str) -> Counter:
+    """Word unigrams/bigrams plus char 3-5 grams."""
+    text = _normalize(text)
+    words = text.split()
+    feats = Counter(f"w:{w}" for w in words)
+    feats.update(f"b:{a}_{b}" for a, b in zip(words, words[1:]))
+    padded = f" {text} "
+    for n in (3, 4, 5):
+        feats.update(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+    return feats
+
+
+def label_for(decisions: list):
+    """Collapse a DMM decision list into one training label."""
+    from Backend.Model import SplitDecision
+    if not decisions:
+        return None
+    if len(decisions) > 1:
+        return "compound"
+    func, _ = SplitDecision(decisions[0])
+    return func
+
+
+# -------- Training Data --------
+def load_pairs(path: str = None):
+    """Read (query, label) pairs from the DMM log; only remote answers are ground truth."""
+    path = path or log_path()
+    pairs = []
+    if not os.path.exists(path):
+        return pairs
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if row.get("source") != "remote":
+                continue
+            label = label_for(row.get("decisions"))
+            if label and row.get("query"):
+                pairs.append((row["query"], label, row.get("latency")))
+    return pairs
+
+
+def _split(query: str) -> str:
+    """Stable split by query: 80% train, 10% calibration (temperature, threshold), 10% evaluation."""
+    bucket = zlib.crc32(_normalize(query).encode("utf-8")) % 100
+    return "calibration" if bucket < 10 else "evaluation" if bucket < 20 else "train"
+
+
+# -------- Model --------
+class IntentClassifier:
+    """
+    Multinomial Naive Bayes over word and char n-grams. Its raw posteriors are far
+    too sure of themselves (every n-gram votes independently), so confidences are
+    temperature-scaled and the threshold is tuned on held-out data.
+    """
+
+    def __init__(self, data: dict):
+        self.version = data.get("version", MODEL_VERSION)
+        self.labels = data["labels"]
+        self.priors = data["priors"]
+        self.vocab = set(data["vocab"])
+        self.weights = data["weights"]
+        self.unknown = data["unknown"]
+        self.temperature = data.get("temperature", 1.0)
+        self.threshold = data.get("threshold", DEFAULT_THRESHOLD)
+        self.trained_at = data.get("trained_at")
+
+    @classmethod
+    def train(cls, pairs, alpha: float = 0.1, threshold: float = NEVER):
+        docs = [(features(q), label) for q, label, *_ in pairs]
+        n = len(docs)
+        vocab = set()
+        label_counts = Counter(label for _, label in docs)
+        totals = defaultdict(Counter)
+        for feats, label in docs:
+            totals[label].update(feats)
+            vocab.update(feats)
+
+        weights, unknown = {}, {}
+        for label, counts in totals.items():
+            denom = sum(counts.values()) + alpha * len(vocab)
+            weights[label] = {f: math.log((v + alpha) / denom) for f, v in counts.items()}
+            unknown[label] = math.log(alpha / denom)
+
+        return cls({
+            "version": MODEL_VERSION,
+            "labels": sorted(label_counts),
+            "priors": {l: math.log(c / n) for l, c in label_counts.items()},
+            "vocab": sorted(vocab),
+            "weights": weights,
+            "unknown": unknown,
+            "threshold": threshold,
+            "trained_at": datetime.utcnow().isoformat(),
+        })
+
+    def calibrate(self, pairs, target_precision: float = TARGET_PRECISION):
+        """
+        Fit the temperature that minimises log loss on held-out pairs, then pick the
+        lowest threshold whose answered general/realtime predictions reach target_precision.
+        With too few samples to tell, the threshold stays at NEVER and every query goes remote.
+        """
+        scored = [(self.scores(q), label) for q, label, *_ in pairs]
+        if not scored:
+            return self
+
+        def log_loss(t):
+            loss = 0.0
+            for scores, label in scored:
+                top = max(scores.values())
+                total = sum(math.exp((s - top) / t) for s in scores.values())
+                p = math.exp((scores.get(label, top - 1e6) - top) / t) / total
+                loss -= math.log(max(p, 1e-12))
+            return loss
+        self.temperature = min((2 ** (k / 2) for k in range(0, 25)), key=log_loss)
+
+        answered = sorted((self._confidence(scores), self._best(scores) == label)
+                          for scores, label in scored if self._best(scores) in ANSWERABLE)
+        self.threshold = NEVER  # nothing qualifies until proven otherwise
+        if len(answered) < MIN_CALIBRATION:
+            return self
+        for i, (confidence, _) in enumerate(answered):
+            kept = [ok for _, ok in answered[i:]]
+            if len(kept) < MIN_CALIBRATION:
+                break
+            if sum(kept) / len(kept) >= target_precision:
+                self.threshold = max(MIN_THRESHOLD, confidence)
+                break
+        return self
+
+    def save(self, path: str = None):
+        path = path or model_path(self.version)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": self.version, "labels": self.labels, "priors": self.priors,
+                "vocab": sorted(self.vocab), "weights": self.weights, "unknown": self.unknown,
+                "temperature": self.temperature, "threshold": self.threshold, "trained_at": self.trained_at,
+            }, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+
+    def scores(self, text: str):
+        """Naive Bayes log joint probability of every label."""
+        feats = features(text)
+        scores = {}
+        for label in self.labels:
+            w, unk = self.weights[label], self.unknown[label]
+            score = self.priors[label]
+            for f, tf in feats.items():
+                if f in self.vocab:  # features never seen in training carry no signal
+                    score += tf * w.get(f, unk)
+            scores[label] = score
+        return scores
+
+    @staticmethod
+    def _best(scores):
+        return max(scores, key=scores.get)
+
+    def _confidence(self, scores):
+        top = max(scores.values())
+        return 1.0 / sum(math.exp((s - top) / self.temperature) for s in scores.values())
+
+    def predict(self, text: str):
+        """Return (label, calibrated confidence)."""
+        scores = self.scores(text)
+        return self._best(scores), self._confidence(scores)
+
+
+# -------- Lazy Loading --------
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+def get_model():
+    """Load the versioned artifact on first use; None if it has not been trained yet."""
+    global _model, _model_loaded
+    if _model_loaded:
+        return _model
+    with _model_lock:
+        if not _model_loaded:
+            try:
+                if os.path.exists(model_path()):
+                    with open(model_path(), "r", encoding="utf-8") as f:
+                        _model = IntentClassifier(json.load(f))
+            except Exception:
+                traceback.print_exc()
+                _model = None
+            _model_loaded = True
+    return _model
+
+def reload_model():
+    global _model_loaded
+    with _model_lock:
+        _model_loaded = False
+    return get_model()
+
+
+def classify(query: str):
+    """Decision list for confident general/realtime queries, else None."""
+    model = get_model()
+    if model is None:
+        return None
+    if CLAUSE_SEPARATORS.search(str(query or "")):
+        return None  # possibly compound; only the remote DMM can split it
+    label, confidence = model.predict(query)
+    if label in ANSWERABLE and confidence >= model.threshold:
+        return [f"{label} {str(query).strip()}"]
+    return None
+
+
+# -------- Reporting --------
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def report(model: IntentClassifier, pairs):
+    """Accuracy against the remote DMM's labels and local vs remote latency."""
+    correct = answered = answered_correct = 0
+    local_ms, remote_ms = [], []
+    for query, label, latency in pairs:
+        start = time.perf_counter()
+        predicted, confidence = model.predict(query)
+        if CLAUSE_SEPARATORS.search(str(query or "")):
+            confidence = 0.0  # classify() refuses these
+        local_ms.append((time.perf_counter() - start) * 1000)
+        if latency:
+            remote_ms.append(latency * 1000)
+        correct += predicted == label
+        if predicted in ANSWERABLE and confidence >= model.threshold:
+            answered += 1
+            answered_correct += predicted == label
+    n = len(pairs) or 1
+    return {
+        "samples": len(pairs),
+        "accuracy": correct / n,
+        "coverage": answered / n,
+        "precision_when_answered": (answered_correct / answered) if answered else 0.0,
+        "local_p50_ms": _percentile(local_ms, 50),
+        "local_p95_ms": _percentile(local_ms, 95),
+        "remote_p50_ms": _percentile(remote_ms, 50),
+        "remote_p95_ms": _percentile(remote_ms, 95),
+    }
+
+
+# -------- CLI --------
+# python -m Backend.IntentClassifier train [log.jsonl]   -> trains on 80%, calibrates on 10%, reports on the other 10%
+# python -m Backend.IntentClassifier report [log.jsonl]  -> reports the saved model on the evaluation split
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    pairs = load_pairs(sys.argv[2] if len(sys.argv) > 2 else None)
+    # the threshold is tuned on the calibration split, so it would look too good scored there
+    train_set = [p for p in pairs if _split(p[0]) == "train"]
+    calibration = [p for p in pairs if _split(p[0]) == "calibration"]
+    evaluation = [p for p in pairs if _split(p[0]) == "evaluation"]
+
+    if command == "train":
+        if not train_set:
+            print("No remote DMM decisions logged yet; nothing to train on.")
+            sys.exit(1)
+        model = IntentClassifier.train(train_set).calibrate(calibration)
+        print(f"Saved {model.save()} ({len(train_set)} samples, labels: {', '.join(model.labels)}, "
+              f"temperature {model.temperature:.2f}, threshold {model.threshold:.3f})")
+    else:
+        model = get_model()
+        if model is None:
+            print("No trained model found; run 'train' first.")
+            sys.exit(1)
+
+    print(json.dumps(report(model, evaluation), indent=2))
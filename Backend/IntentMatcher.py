@@ -0,0 +1,263 @@
+import re, time, threading
+from dotenv import dotenv_values
+
+# Load environment variables
+env_vars = dotenv_values(".env")
+Assistantname = env_vars.get("Assistantname", "Kashi AI")
+
+# -------- Vocabulary --------
+# Words that mean the same as the DMM's task keywords. Anything not listed here
+# is left to the remote model so the fast path never guesses.
+OPEN_VERBS = ("open", "launch")
+CLOSE_VERBS = ("close",)
+# "quit smoking" is not a command; these verbs only count in front of a known app.
+APP_ONLY_CLOSE_VERBS = ("quit", "exit", "kill")
+KNOWN_APPS = {
+    "chrome", "google chrome", "firefox", "edge", "microsoft edge", "brave", "opera", "notepad",
+    "calculator", "spotify", "vlc", "discord", "telegram", "whatsapp", "zoom", "teams", "microsoft teams",
+    "word", "excel", "powerpoint", "outlook", "paint", "file explorer", "explorer", "steam",
+    "vs code", "vscode", "visual studio code", "task manager", "settings", "camera", "skype", "obs",
+}
+PLAY_VERBS = ("play",)
+
+EXIT_PHRASES = {
+    "bye", "goodbye", "good bye", "bye bye", "exit", "quit", "see you",
+    "see you later", "good night", "goodnight",
+}
+
+SYSTEM_PHRASES = {
+    "mute": "mute", "mute the volume": "mute", "mute volume": "mute",
+    "unmute": "unmute", "unmute the volume": "unmute", "unmute volume": "unmute",
+    "volume up": "volume up", "increase volume": "volume up", "increase the volume": "volume up",
+    "turn up the volume": "volume up", "turn volume up": "volume up", "louder": "volume up",
+    "volume down": "volume down", "decrease volume": "volume down", "decrease the volume": "volume down",
+    "turn down the volume": "volume down", "turn volume down": "volume down", "quieter": "volume down",
+}
+
+POLITE_PREFIXES = ("please ", "can you please ", "could you please ", "can you ", "could you ", "kindly ")
+POLITE_SUFFIXES = (" please", " for me", " now")
+
+# Clause separators for compound commands like "open chrome and firefox".
+CLAUSE_SPLIT = re.compile(r"\s*(?:,|\band then\b|\band\b|\bthen\b)\s*")
+
+GOOGLE_PATTERNS = [
+    re.compile(r"^google search (?:for )?(?P<arg>.+)$"),
+    re.compile(r"^search google for (?P<arg>.+)$"),
+    re.compile(r"^search (?:for )?(?P<arg>.+) on google$"),
+    re.compile(r"^google (?P<arg>.+)$"),
+]
+
+YOUTUBE_PATTERNS = [
+    re.compile(r"^youtube search (?:for )?(?P<arg>.+)$"),
+    re.compile(r"^search youtube for (?P<arg>.+)$"),
+    re.compile(r"^search (?:for )?(?P<arg>.+) on youtube$"),
+]
+
+REMEMBER_PATTERN = re.compile(r"^remember(?: that)? (?P<arg>.+)$")
+FORGET_PATTERN = re.compile(r"^forget(?: that| about)? (?P<arg>.+)$")
+
+# Words that turn an innocent-looking clause into something the model should see.
+AMBIGUOUS_WORDS = {"it", "this", "that", "them", "something", "anything", "what", "how", "why", "who"}
+
+
+# -------- Stats --------
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "match_time": 0.0}
+
+
+def _record(hit: bool, elapsed: float):
+    with _stats_lock:
+        _stats["hits" if hit else "misses"] += 1
+        _stats["match_time"] += elapsed
+
+
+def get_stats():
+    """Return hit/miss counters; every hit is one Cohere call saved."""
+    with _stats_lock:
+        total = _stats["hits"] + _stats["misses"]
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "hit_rate": (_stats["hits"] / total) if total else 0.0,
+            "avg_match_ms": (_stats["match_time"] / total * 1000) if total else 0.0,
+        }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update({"hits": 0, "misses": 0, "match_time": 0.0})
+
+
+# -------- Normalization --------
+def _wake_names():
+    names = {"kashi", "kaashi"}
+    if Assistantname:
+        names.add(Assistantname.lower())
+        names.add(Assistantname.lower().split()[0])
+    return names
+
+
+def normalize(query: str, keep_case: bool = False) -> str:
+    """
+    Drop punctuation at the edges, wake names and polite filler; lowercased unless
+    keep_case, which leaves the words as typed so arguments can be sliced from it.
+    """
+    q = re.sub(r"\s+", " ", str(query or "").strip())
+    q = q.strip(" .!?")
+
+    for name in sorted(_wake_names(), key=len, reverse=True):
+        low = q.lower()
+        if low.startswith(name + " ") or low.startswith(name + ", "):
+            q = q[len(name):].lstrip(" ,")
+        if q.lower().endswith(" " + name):
+            q = q[: -len(name)].rstrip(" ,")
+        if q.lower() == name:
+            return ""
+
+    changed = True
+    while changed:
+        changed = False
+        for p in POLITE_PREFIXES:
+            if q.lower().startswith(p):
+                q, changed = q[len(p):], True
+        for s in POLITE_SUFFIXES:
+            if q.lower().endswith(s):
+                q, changed = q[: -len(s)], True
+    q = q.strip(" .!?,")
+    return q if keep_case else q.lower()
+
+
+# -------- Clause Matching --------
+def _clean_arg(arg: str):
+    arg = arg.strip(" .!?,")
+    if not arg or arg in AMBIGUOUS_WORDS:
+        return None
+    return arg
+
+
+def _has_command_tail(arg: str) -> bool:
+    """True when an argument swallowed a second command ("x and open chrome")."""
+    verbs = OPEN_VERBS + CLOSE_VERBS + APP_ONLY_CLOSE_VERBS + PLAY_VERBS + ("search", "google", "youtube", "tell", "remember", "forget")
+    return any(
+        part.strip().startswith(v + " ") or part.strip() == v
+        for part in CLAUSE_SPLIT.split(arg)[1:] for v in verbs
+    )
+
+
+def _match_verb(clause: str, verbs, func: str, apps_only: bool = False):
+    for verb in verbs:
+        if clause.startswith(verb + " "):
+            arg = _clean_arg(clause[len(verb) + 1:].removeprefix("the "))
+            if apps_only and arg not in KNOWN_APPS:
+                continue
+            if arg and len(arg.split()) <= 4 and not (set(arg.split()) & AMBIGUOUS_WORDS):
+                return f"{func} {arg}"
+    return None
+
+
+def _match_clause(clause: str, last_func: str = None):
+    """Match a single clause; returns (decision, func) or (None, None)."""
+    if clause in SYSTEM_PHRASES:
+        return f"system {SYSTEM_PHRASES[clause]}", "system"
+
+    for pattern in YOUTUBE_PATTERNS:
+        m = pattern.match(clause)
+        if m and _clean_arg(m.group("arg")):
+            return f"youtube search {_clean_arg(m.group('arg'))}", "youtube search"
+
+    for pattern in GOOGLE_PATTERNS:
+        m = pattern.match(clause)
+        if m and _clean_arg(m.group("arg")):
+            return f"google search {_clean_arg(m.group('arg'))}", "google search"
+
+    for verbs, func, apps_only in ((OPEN_VERBS, "open", False), (CLOSE_VERBS, "close", False),
+                                   (APP_ONLY_CLOSE_VERBS, "close", True)):
+        decision = _match_verb(clause, verbs, func, apps_only)
+        if decision:
+            return decision, func
+
+    if clause.startswith("play "):
+        arg = _clean_arg(clause[len("play "):])
+        if arg and not (set(arg.split()) & AMBIGUOUS_WORDS):
+            return f"play {arg}", "play"
+
+    # "open chrome and firefox" -> the second clause inherits "open". Only a known app name
+    # inherits it: "open notepad and write a poem" must not become "open write a poem".
+    if last_func in ("open", "close"):
+        arg = _clean_arg(clause.removeprefix("the "))
+        if arg in KNOWN_APPS:
+            return f"{last_func} {arg}", last_func
+
+    return None, None
+
+
+# -------- Public API --------
+def match_intent(query: str):
+    """
+    Resolve unambiguous commands locally into the same decision list that
+    FirstLayerDMM returns. Returns None when the query must go to the model.
+    """
+    start = time.perf_counter()
+    decisions = _match(query)
+    _record(decisions is not None, time.perf_counter() - start)
+    return decisions
+
+
+def peek_intent(query: str) -> bool:
+    """True if match_intent would resolve the query; not counted in the stats."""
+    return _match(query) is not None
+
+
+def _original(m, original: str, q: str):
+    """The "arg" group of a match on the lowercased q, with its case as the user typed it."""
+    if len(original) != len(q):
+        return m.group("arg")  # lowercasing changed the length (rare Unicode); positions don't line up
+    return original[m.start("arg"):m.end("arg")]
+
+
+def _match(query: str):
+    original = normalize(query, keep_case=True)
+    q = original.lower()
+    if not q:
+        return None
+
+    if q in EXIT_PHRASES or q.startswith("bye "):
+        return ["exit"]
+
+    # Memory commands keep the rest of the sentence verbatim, commas included.
+    # Matching is done on the lowercased text; the argument keeps its case ("My name is Nirav").
+    m = REMEMBER_PATTERN.match(q)
+    if m:
+        arg = _clean_arg(m.group("arg"))
+        return [f"remember {_original(m, original, q).strip(' .!?,')}"] if arg and not _has_command_tail(arg) else None
+    m = FORGET_PATTERN.match(q)
+    if m:
+        arg = _clean_arg(m.group("arg"))
+        return [f"forget {_original(m, original, q).strip(' .!?,')}"] if arg and not _has_command_tail(arg) else None
+
+    # Searches keep their topic verbatim too.
+    for patterns, func in ((YOUTUBE_PATTERNS, "youtube search"), (GOOGLE_PATTERNS, "google search")):
+        for pattern in patterns:
+            m = pattern.match(q)
+            if m:
+                arg = _clean_arg(m.group("arg"))
+                if arg and not CLAUSE_SPLIT.search(arg):
+                    return [f"{func} {_original(m, original, q).strip(' .!?,')}"]
+
+    decisions = []
+    last_func = None
+    for clause in CLAUSE_SPLIT.split(q):
+        clause = clause.strip()
+        if not clause:
+            continue
+        decision, last_func = _match_clause(clause, last_func)
+        if not decision:
+            return None
+        decisions.append(decision)
+
+    return decisions or None
+
+
+if __name__ == "__main__":
+    while True:
+        print(match_intent(input(">>> ")), get_stats())
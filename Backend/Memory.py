@@ -1,10 +1,25 @@
-import os, json, traceback
+import os, re, json, time, uuid, atexit, threading, traceback
 from datetime import datetime
-import pyrebase, config
-from firebaseConfig import firebaseConfig
+import config
+from Backend.Clients import firebase_app
+from Backend.ResponseCache import response_cache
+from Backend.FactIndex import FactIndex
+from Backend.ContextWindow import count_tokens
+from dotenv import dotenv_values
+
+# Load environment variables
+env_vars = dotenv_values(".env")
+VersionCheckSeconds = float(env_vars.get("MemoryVersionCheck") or 60)  # how often to look for writes from other sessions
+FlushDelay = float(env_vars.get("MemoryFlushDelay") or 2)         # quiet time before a background flush
+FlushMaxDelay = float(env_vars.get("MemoryFlushMaxDelay") or 10)  # upper bound while changes keep arriving
+FlushRetryDelay = 30
+JournalMaxBytes = int(env_vars.get("MemoryJournalMaxBytes") or 64 * 1024)  # compact into a snapshot past this size
+MaxWriters = 32  # sessions whose last op a document remembers; older ones are replayed again (harmlessly)
+MemoryTopK = int(env_vars.get("MemoryTopK") or 8)                    # facts per prompt
+MemoryTokenBudget = int(env_vars.get("MemoryTokenBudget") or 300)    # tokens for the whole profile block
 
 # Initialize Firebase
-firebase = pyrebase.initialize_app(firebaseConfig)
+firebase = firebase_app()
 db = firebase.database()
 
 # -------- Local Fallback (in case Firebase not available) --------
@@ -13,24 +28,62 @@ def _data_dir():
     os.makedirs(d, exist_ok=True)
     return d
 
-def _mem_path():
-    return os.path.join(_data_dir(), "Memory.json")
+def _mem_path(uid: str = None):
+    return os.path.join(_data_dir(), f"Memory.{uid}.json" if uid else "Memory.json")
+
+def _journal_path(uid: str = None):
+    return os.path.join(_data_dir(), f"MemoryJournal.{uid or 'local'}.jsonl")
 
 # -------- Memory Manager --------
 class MemoryManager:
-    def __init__(self):
-        self.path = _mem_path()
-        self.data = {"facts": [], "preferences": {}, "last_updated": None}
+    """
+    One user's facts and preferences. Mutations apply in memory at once and are
+    appended to a local journal (the snapshot plus the journal is the local copy);
+    a debounced background flush writes the whole document to Firebase. The
+    journal is folded into the snapshot only once it grows past JournalMaxBytes.
+    """
+
+    def __init__(self, uid: str = None):
+        self.uid = uid or config.FirebaseUID
+        self.path = _mem_path(self.uid)
+        self.journal_path = _journal_path(self.uid)
+        self.data = {"facts": [], "preferences": {}, "last_updated": None, "version": 0}
+        self.index = FactIndex()     # the live facts; data["facts"] is refreshed from it on flush
+        self.checked_at = 0.0
+        self._prompt = None  # (username, version) -> prompt text, rebuilt only after a change
+        self._lock = threading.RLock()
+        self._checking = False
+        self._dirty_since = None     # time of the oldest unflushed change
+        self._journaled = 0          # journal lines not yet folded into the snapshot
+        self.session = uuid.uuid4().hex[:12]  # tags this process's ops; versions alone collide across sessions
+        self._synced_version = 0     # version of the document last read from or written to Firebase
+        self._synced_writers = {}    # its "writers": session -> last op of that session it contains
+        self._timer = None
         self._load()
 
+    @property
+    def version(self) -> int:
+        return int(self.data.get("version") or 0)
+
     # ----- Firebase Sync -----
     def _load(self):
-        """Load memory from Firebase, fallback to local file."""
+        """Load memory from Firebase, fallback to local file, then replay unflushed changes."""
+        self.checked_at = time.time()
+        self._prompt = None
+        self._load_snapshot()
+        self.index = FactIndex(self.data.get("facts") or [])
+        self._replay_journal()
+
+    def _load_snapshot(self):
         try:
-            if config.FirebaseUID and config.FirebaseToken:
-                fb_data = db.child("users").child(config.FirebaseUID).child("memory").get(config.FirebaseToken).val()
+            if self.uid and config.FirebaseToken:
+                fb_data = db.child("users").child(self.uid).child("memory").get(config.FirebaseToken).val()
                 if fb_data:
-                    self.data = fb_data
+                    self.data = dict(fb_data)
+                    self.data.setdefault("facts", [])
+                    self.data.setdefault("preferences", {})
+                    self._synced_version = self.version
+                    self._synced_writers = dict(self.data.get("writers") or {})
                     return
         except Exception:
             traceback.print_exc()
@@ -41,92 +94,360 @@ class MemoryManager:
                 with open(self.path, "r", encoding="utf-8") as f:
                     self.data = json.load(f)
             except Exception:
-                self.data = {"facts": [], "preferences": {}, "last_updated": None}
-                self._save()
+                self.data = {"facts": [], "preferences": {}, "last_updated": None, "version": 0}
 
-    def _save(self):
-        """Save memory to Firebase and local file."""
-        self.data["last_updated"] = datetime.utcnow().isoformat()
+    def _remote_version(self):
+        """Only the version number from Firebase; None when it can't be read."""
+        if not (self.uid and config.FirebaseToken):
+            return None
+        try:
+            return int(db.child("users").child(self.uid).child("memory").child("version").get(config.FirebaseToken).val() or 0)
+        except Exception:
+            traceback.print_exc()
+            return None
+
+    def sync(self):
+        """Reload if another session (desktop, web) saved a newer version."""
+        remote = self._remote_version()
+        with self._lock:
+            self.checked_at = time.time()
+            if remote is not None and remote > self._synced_version:
+                self._merge_remote()
+
+    def _merge_remote(self):
+        """Reload the newer document from Firebase; the replay re-applies every op it doesn't contain yet."""
+        self._load()
 
-        # save to Firebase
+    def _sync_in_background(self):
         try:
-            if config.FirebaseUID and config.FirebaseToken:
-                db.child("users").child(config.FirebaseUID).child("memory").set(self.data, config.FirebaseToken)
+            self.sync()
+        finally:
+            self._checking = False
+
+    def maybe_sync(self):
+        """Start a background version check when the last one is older than VersionCheckSeconds."""
+        if self._checking or time.time() - self.checked_at < VersionCheckSeconds:
+            return
+        self._checking = True
+        threading.Thread(target=self._sync_in_background, daemon=True, name="MemorySync").start()
+
+    # ----- Journal -----
+    @staticmethod
+    def _covered(op: dict, writers: dict, version: int) -> bool:
+        """True if a document with these writers and version already contains op."""
+        if "s" in op:
+            return op["v"] <= int(writers.get(op["s"]) or 0)
+        return "v" in op and op["v"] <= version  # journaled before ops carried a session
+
+    def _mark(self, op: dict):
+        """Record in the document that it now contains op."""
+        writers = self.data.setdefault("writers", {})
+        writers[op["s"]] = max(op["v"], int(writers.get(op["s"]) or 0))
+        while len(writers) > MaxWriters:
+            del writers[min(writers, key=writers.get)]
+
+    def _replay_journal(self):
+        """Re-apply changes that were journaled but never flushed (e.g. after a crash)."""
+        self._journaled = 0
+        if not os.path.exists(self.journal_path):
+            return
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                ops = [json.loads(line) for line in f if line.strip()]
+        except Exception:
+            traceback.print_exc()
+            return
+        self._journaled = len(ops)
+        # the loaded document lists the last op of every session it contains; replay the rest
+        loaded = self.version
+        writers = dict(self.data.get("writers") or {})
+        pending = [op for op in ops if not self._covered(op, writers, loaded)]
+        for op in pending:
+            self._apply(op)
+            if "s" in op:
+                self._mark(op)
+        if pending:
+            self.data["version"] = max([loaded + 1] + [op.get("v", 0) for op in pending])
+            self._schedule_flush()  # Firebase hasn't seen these yet
+        self._maybe_compact()
+
+    def _append_journal(self, op: dict):
+        try:
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._journaled += 1
         except Exception:
             traceback.print_exc()
 
-        # save locally as backup
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+    def _maybe_compact(self):
+        try:
+            if os.path.getsize(self.journal_path) > JournalMaxBytes:
+                self.compact()
+        except OSError:
+            pass  # no journal yet
 
-    # ---- Facts ----
-    def remember_fact(self, text: str):
-        text = str(text).strip()
-        if text and text not in self.data["facts"]:
-            self.data["facts"].append(text)
-            self._save()
+    def compact(self):
+        """
+        Fold the journal into a fresh snapshot, written atomically, then drop the lines
+        Firebase already has. Unflushed lines stay: a reload prefers the Firebase copy.
+        """
+        with self._lock:
+            self.data["facts"] = self.index.list()
+            snapshot = json.dumps(self.data, ensure_ascii=False)
+            if self.uid and config.FirebaseToken:
+                writers, version = self._synced_writers, self._synced_version
+            else:
+                writers, version = self.data.get("writers") or {}, self.version  # the snapshot is the store
+            try:
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(snapshot)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except Exception:
+                traceback.print_exc()
+                return  # the old snapshot plus the whole journal is still consistent
+            self._compact_journal(writers, version)
+
+    def _compact_journal(self, writers: dict, version: int):
+        """Drop the journal lines a document with these writers and version already contains."""
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                lines = [line for line in f if line.strip()]
+            remaining = [line for line in lines if not self._covered(json.loads(line), writers, version)]
+            tmp = self.journal_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(remaining)
+            os.replace(tmp, self.journal_path)
+            self._journaled = len(remaining)
+        except FileNotFoundError:
+            self._journaled = 0
+        except Exception:
+            traceback.print_exc()
+
+    # ----- Write-Behind -----
+    def _schedule_flush(self, delay: float = None):
+        now = time.time()
+        if self._dirty_since is None:
+            self._dirty_since = now
+        if self._timer:
+            self._timer.cancel()
+        # keep pushing the flush back while changes arrive, but never past FlushMaxDelay
+        wait = FlushDelay if delay is None else delay
+        wait = max(0.0, min(wait, self._dirty_since + FlushMaxDelay - now))
+        self._timer = threading.Timer(wait, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """Write the current document to Firebase; the local copy is already safe in the journal."""
+        with self._lock:
+            if self._dirty_since is None:
+                return
+
+        # never overwrite a newer version saved by another session (checked here, off the caller's thread)
+        remote = self._remote_version()
+        with self._lock:
+            if remote is not None and remote > self._synced_version:
+                self._merge_remote()
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            self.data["facts"] = self.index.list()
+            snapshot = json.loads(json.dumps(self.data))
+            self._dirty_since = None
+
+        try:
+            if self.uid and config.FirebaseToken:
+                db.child("users").child(self.uid).child("memory").set(snapshot, config.FirebaseToken)
+                with self._lock:
+                    self._synced_version = max(self._synced_version, int(snapshot.get("version") or 0))
+                    self._synced_writers = dict(snapshot.get("writers") or {})
+        except Exception:
+            traceback.print_exc()
+            with self._lock:
+                self._schedule_flush(delay=FlushRetryDelay)
+
+    def _changed(self, op: dict):
+        """Record an applied mutation: new version, journal entry, flush later."""
+        self.data["last_updated"] = datetime.utcnow().isoformat()
+        self.data["version"] = self.version + 1
+        self._prompt = None
+        op = dict(op, s=self.session, v=self.version)
+        self._append_journal(op)
+        self._mark(op)
+        self._maybe_compact()
+        self._schedule_flush()
+
+        # personal answers were generated from the old memory
+        response_cache.invalidate(self.uid)
+
+    def _commit(self, op: dict) -> bool:
+        with self._lock:
+            if not self._apply(op):
+                return False
+            self._changed(op)
             return True
+
+    def _apply(self, op: dict) -> bool:
+        """Apply one journaled operation to self.data; True if anything changed."""
+        kind = op.get("op")
+        prefs = self.data.setdefault("preferences", {})
+        if kind == "remember":
+            return self.index.add(op["text"])
+        elif kind == "forget":
+            # ops journaled before forgets were resolved carry the raw text instead of the facts
+            targets = op["facts"] if "facts" in op else self.resolve_forget(op["text"])
+            return any([self.index.remove(f) for f in targets])
+        elif kind == "set_preference":
+            if prefs.get(op["key"]) != op["value"]:
+                prefs[op["key"]] = op["value"]
+                return True
+        elif kind == "delete_preference":
+            if op["key"] in prefs:
+                del prefs[op["key"]]
+                return True
         return False
 
+    # ---- Facts ----
+    def remember_fact(self, text: str):
+        return self._commit({"op": "remember", "text": str(text).strip()})
+
+    def resolve_forget(self, text: str):
+        """Facts a forget request refers to: the exact fact, else every fact containing it, else the closest one."""
+        exact = self.index.get(text)
+        if exact:
+            return [exact]
+        found = self.index.containing(text)
+        if found:
+            return found
+        closest = self.index.closest(text)
+        return [closest] if closest else []
+
     def forget_fact(self, text: str):
-        if text in self.data["facts"]:
-            self.data["facts"].remove(text)
-            self._save()
-            return True
-        # try substring match
-        removed = [f for f in self.data["facts"] if text.lower() in f.lower()]
-        if removed:
-            self.data["facts"] = [f for f in self.data["facts"] if text.lower() not in f.lower()]
-            self._save()
-            return True
-        return False
+        with self._lock:
+            targets = self.resolve_forget(text)
+            # journal the resolved facts, so a replay removes exactly these
+            return bool(targets) and self._commit({"op": "forget", "facts": targets})
 
     # ---- Preferences ----
     def set_preference(self, key: str, value: str):
-        key = str(key).strip().lower()
-        self.data["preferences"][key] = str(value).strip()
-        self._save()
+        self._commit({"op": "set_preference", "key": str(key).strip().lower(), "value": str(value).strip()})
         return True
 
     def get_preference(self, key: str, default=None):
         return self.data["preferences"].get(str(key).strip().lower(), default)
 
     def delete_preference(self, key: str):
-        key = str(key).strip().lower()
-        if key in self.data["preferences"]:
-            del self.data["preferences"][key]
-            self._save()
-            return True
-        return False
+        return self._commit({"op": "delete_preference", "key": str(key).strip().lower()})
 
     # ---- Prompt Helper ----
-    def prompt_block(self, username: str = "User") -> str:
-        facts = self.data.get("facts", [])
+    def prompt_block(self, username: str = "User", query: str = None) -> str:
+        """Profile block for the prompt; with a query, the facts most relevant to it come first."""
+        if query is None:
+            if self._prompt and self._prompt[0] == (username, self.version):
+                return self._prompt[1]
+            self._prompt = ((username, self.version), self._build_prompt(username))
+            return self._prompt[1]
+        return self._build_prompt(username, query)
+
+    def _build_prompt(self, username: str, query: str = None, top_k: int = MemoryTopK,
+                      token_budget: int = MemoryTokenBudget) -> str:
         prefs = self.data.get("preferences", {})
-        if not facts and not prefs:
+        if not len(self.index) and not prefs:
             return f"User profile for {username}: (no saved memory yet)."
 
-        lines = [f"User profile for {username}:"]
-        if prefs:
-            lines.append("Preferences: " + "; ".join([f"{k} = {v}" for k, v in prefs.items()]))
-        if facts:
-            lines.append("Facts: " + "; ".join(facts[:20]))
-            if len(facts) > 20:
-                lines.append(f"... (+{len(facts)-20} more facts)")
+        # relevant facts first, then the most recent ones until top_k
+        ranked = [fact for _, fact in self.index.search(query, top_k)] if query else []
+        for fact in self.index.recent(top_k):
+            if len(ranked) >= top_k:
+                break
+            if fact not in ranked:
+                ranked.append(fact)
+
+        query_words = set(re.findall(r"\w+", str(query or "").lower()))
+        pref_items = sorted(prefs.items(), key=lambda kv: not (set(re.findall(r"\w+", f"{kv[0]} {kv[1]}".lower())) & query_words))
+
+        header = f"User profile for {username}:"
+        used = count_tokens(header)
+        chosen_prefs, chosen_facts = [], []
+        for k, v in pref_items:
+            cost = count_tokens(f"{k} = {v}; ")
+            if used + cost <= token_budget:
+                chosen_prefs.append(f"{k} = {v}")
+                used += cost
+        for fact in ranked:
+            cost = count_tokens(f"{fact}; ")
+            if used + cost <= token_budget:
+                chosen_facts.append(fact)
+                used += cost
+
+        lines = [header]
+        if chosen_prefs:
+            lines.append("Preferences: " + "; ".join(chosen_prefs))
+        if chosen_facts:
+            lines.append("Facts: " + "; ".join(chosen_facts))
+        if len(self.index) > len(chosen_facts):
+            lines.append(f"... (+{len(self.index) - len(chosen_facts)} more facts)")
         return "\n".join(lines)
 
+# -------- Per-User Instances --------
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_manager(uid: str = None) -> MemoryManager:
+    """The process-wide MemoryManager of a user, loaded from Firebase on first use only."""
+    uid = uid or config.FirebaseUID
+    with _managers_lock:
+        manager = _managers.get(uid)
+        if manager is None:
+            manager = _managers[uid] = MemoryManager(uid)
+    return manager
+
+def invalidate_memory(uid: str = None):
+    """Drop the cached memory of one user (or everyone) so the next access reloads it."""
+    with _managers_lock:
+        dropped = list(_managers.values()) if uid is None else [m for m in [_managers.get(uid)] if m]
+        if uid is None:
+            _managers.clear()
+        else:
+            _managers.pop(uid, None)
+    for manager in dropped:
+        manager.flush()  # pending changes still belong in the store
+
+def flush_all():
+    """Write out every pending change now, e.g. on shutdown."""
+    with _managers_lock:
+        managers = list(_managers.values())
+    for manager in managers:
+        manager.flush()
+
+atexit.register(flush_all)
+
+def _mutate(method, *args):
+    manager = get_manager()
+    with manager._lock:
+        return method(manager, *args)
+
+
 # -------- Convenience Functions --------
-def get_memory_prompt(username="User"):
-    return MemoryManager().prompt_block(username=username)
+def get_memory_prompt(username="User", query: str = None):
+    manager = get_manager()
+    manager.maybe_sync()
+    with manager._lock:
+        return manager.prompt_block(username=username, query=query)
 
 def remember(text: str):
-    return MemoryManager().remember_fact(text)
+    return _mutate(MemoryManager.remember_fact, text)
 
 def forget(text: str):
-    return MemoryManager().forget_fact(text)
+    return _mutate(MemoryManager.forget_fact, text)
 
 def set_preference(key: str, value: str):
-    return MemoryManager().set_preference(key, value)
+    return _mutate(MemoryManager.set_preference, key, value)
 
 def delete_preference(key: str):
-    return MemoryManager().delete_preference(key)
+    return _mutate(MemoryManager.delete_preference, key)
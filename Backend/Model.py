@@ -1,6 +1,13 @@
-import cohere  # Import the Cohere library for AI services.
+import json  # Import json to parse structured decisions.
+import time  # Import time to enforce the structured-mode deadline.
+import threading  # Import threading to guard the decision log.
+import config  # Import config for the signed-in user's id.
 from rich import print  # Import the Rich library to enhance terminal outputs.
 from dotenv import dotenv_values  # Import dotenv to load environment variables from a .env file.
+from Backend.IntentMatcher import match_intent  # Local fast path for unambiguous commands.
+from Backend.DecisionCache import DecisionCache, fingerprint  # Persistent cache of past decisions.
+from Backend.IntentClassifier import classify, log_path  # Offline-trained local classifier.
+from Backend.Clients import cohere_client  # Shared, connection-pooled API clients.
 
 # Load environment variables from the .env file.
 env_vars = dotenv_values(".env")
@@ -8,8 +15,12 @@ env_vars = dotenv_values(".env")
 # Retrieve API key.
 CohereAPIKey = env_vars.get("CohereAPIKey")
 
-# Create a Cohere client using the provided API key.
-co = cohere.Client(api_key=CohereAPIKey)
+# Use the shared, keep-alive Cohere client.
+co = cohere_client()
+
+# 'text' parses the comma-separated reply, 'structured' asks Cohere for a JSON decision list.
+DMMMode = (env_vars.get("DMMMode") or "text").strip().lower()
+DMMDeadline = float(env_vars.get("DMMDeadline") or 8)  # seconds for a structured call, retry included.
 
 # Define a list of recognized function keywords for task categorization.
 funcs = [
@@ -76,30 +87,155 @@ ChatHistory = [
     {"role": "Chatbot", "message": "analyze file C:/data.xlsx what's in this Excel file, open calculator"},
 ]
 
-# Define the main function for decision-making on queries.
-def FirstLayerDMM(prompt: str = "test"):
-    # Add the user's query to the messages list.
-    messages.append({"role": "user", "content": f"{prompt}"})
+# Cache of normalized query -> decisions, keyed by everything that shapes the model's answer.
+DMMModel = "command-r-plus"
+decision_cache = DecisionCache(namespace=fingerprint(DMMModel, DMMMode, preamble, funcs, ChatHistory))
 
-    # Create a streaming chat session with the Cohere model.
-    stream = co.chat_stream(
-        model='command-r-plus',          # Specify the Cohere model to use.
+def InvalidateDecisionCache():
+    """Call after editing funcs, the preamble or the few-shots at runtime."""
+    decision_cache.invalidate(fingerprint(DMMModel, DMMMode, preamble, funcs, ChatHistory))
+
+# Open a streaming classification session with the Cohere model.
+# The keyword overrides let the benchmark try other models, temperatures and prompts.
+def OpenDMMStream(prompt: str, model: str = None, temperature: float = 0.7, preamble_text: str = None, history: list = None):
+    return co.chat_stream(
+        model=model or DMMModel,         # Specify the Cohere model to use.
         message=prompt,                  # Pass the user's query.
-        temperature=0.7,                 # Set the creativity level of the model.
-        chat_history=ChatHistory,       # Provide the predefined chat history for context.
+        temperature=temperature,         # Set the creativity level of the model.
+        chat_history=ChatHistory if history is None else history,  # Provide the predefined chat history for context.
         prompt_truncation='OFF',        # Ensure the prompt is not truncated.
         connectors=[],                   # No additional connectors are used.
-        preamble=preamble                # Pass the detailed instruction preamble.
+        preamble=preamble_text or preamble  # Pass the detailed instruction preamble.
     )
 
-    # Initialize an empty string to store the generated response.
-    response = ""
+# Return the task if it starts with a recognized function keyword, else None.
+def ValidDecision(task: str):
+    task = task.strip()
+    for func in funcs:
+        if task.startswith(func):
+            return task
+    return None
 
-    # Iterate over events in the stream and capture text generation events.
-    for event in stream:
-        if event.event_type == "text-generation":
-            response += event.text
+# ---------- Decision Log ----------
+# Every classification is appended to Data/DMMLog.jsonl; remote answers are the training labels.
+_log_lock = threading.Lock()
+
+def LogDecision(prompt: str, decisions: list, source: str, latency: float = None):
+    entry = {
+        "ts": time.time(), "uid": config.FirebaseUID, "query": prompt,
+        "decisions": decisions, "source": source, "latency": latency,
+    }
+    try:
+        with _log_lock, open(log_path(), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"Could not log decision: {e}")
+
+# ---------- Structured Output Mode ----------
+# Split a decision string like 'google search cats' into its function and argument.
+def SplitDecision(task: str):
+    task = task.strip()
+    for func in sorted(funcs, key=len, reverse=True):
+        if task == func or task.startswith(func + " "):
+            return func, task[len(func):].strip()
+    return None, None
 
+# The same few-shots, rewritten as the JSON the structured mode expects.
+def _StructuredChatHistory():
+    history = []
+    for turn in ChatHistory:
+        if turn["role"] == "Chatbot":
+            items = [dict(zip(("type", "argument"), SplitDecision(t))) for t in turn["message"].split(",")]
+            history.append({"role": "Chatbot", "message": json.dumps({"decisions": items})})
+        else:
+            history.append(turn)
+    return history
+
+StructuredChatHistory = _StructuredChatHistory()
+
+StructuredPreamble = preamble + """
+*** Reply ONLY with a JSON object of the form {"decisions": [{"type": "...", "argument": "..."}]}. ***
+*** 'type' must be one of the task names above and 'argument' is the text that follows it (the full query for 'general' and 'realtime', an empty string for 'exit'). Never write the placeholder '(query)'; always copy the user's actual words. Commas inside an argument are allowed. ***
+"""
+
+StructuredSchema = {
+    "type": "object",
+    "required": ["decisions"],
+    "properties": {
+        "decisions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["type", "argument"],
+                "properties": {
+                    "type": {"type": "string", "enum": funcs},
+                    "argument": {"type": "string"},
+                },
+            },
+        },
+    },
+}
+
+# Validate a structured reply against funcs; returns decision strings or None.
+# One bad item (unknown type, empty or placeholder argument) rejects the whole reply:
+# dropping it would silently lose that part of the request and cache the rest.
+def ParseStructuredDecisions(text: str):
+    try:
+        items = json.loads(text).get("decisions", [])
+    except (ValueError, AttributeError):
+        return None
+
+    decisions = []
+    for item in items:
+        if not isinstance(item, dict) or item.get("type") not in funcs:
+            return None
+        func, argument = item["type"], str(item.get("argument") or "").strip()
+        if func == "exit":
+            decisions.append("exit")
+        elif argument and argument.strip("() ").lower() != "query":
+            decisions.append(f"{func} {argument}")
+        else:
+            return None
+    return decisions or None
+
+# One Cohere call returning JSON; retried at most once while the deadline allows.
+# None when both attempts fail, so callers can tell a real decision from the fallback.
+def TryStructuredDMM(prompt: str = "test"):
+    deadline = time.monotonic() + DMMDeadline
+    for attempt in range(2):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            reply = co.chat(
+                model=DMMModel,
+                message=prompt,
+                temperature=0.3 if attempt == 0 else 0.0,
+                chat_history=StructuredChatHistory,
+                prompt_truncation='OFF',
+                connectors=[],
+                preamble=StructuredPreamble,
+                response_format={"type": "json_object", "schema": StructuredSchema},
+                request_options={"timeout_in_seconds": max(1, int(remaining))},
+            )
+        except Exception as e:
+            print(f"Structured DMM attempt {attempt + 1} failed: {e}")
+            continue
+        decisions = ParseStructuredDecisions(reply.text)
+        if decisions:
+            return decisions
+    return None
+
+# Never hand back nothing: treat the query as a general question, as the preamble instructs.
+# The fallback is a guess, so it is neither cached nor logged as a training label.
+def FallbackDecisions(prompt: str):
+    return [f"general {prompt}"]
+
+def FirstLayerDMMStructured(prompt: str = "test"):
+    return TryStructuredDMM(prompt) or FallbackDecisions(prompt)
+
+# Turn the model's comma-separated reply into the filtered list of tasks.
+def ParseDMMText(response: str):
     # Remove newline characters and split responses into individual tasks.
     response = response.replace("\n", "")
     response = response.split(",")
@@ -112,19 +248,143 @@ def FirstLayerDMM(prompt: str = "test"):
 
     #Filter the task base on recognized function keywoards.
     for task in response:
-        for func in funcs:
-            if task.startswith(func):
-                temp.append(task) #add valid tasks to filtered list.
-
-    #update the response with the filterd list of tasks.
-    response = temp
-
-    # if '(query)' is in response , recursively call the function for futher clarification.
-    if "(query)" in response:
-        newresponse = FirstLayerDMM(prompt=prompt)
-        return newresponse #return the clarified response.
-    else:
-        return response #return the filtered response
+        if ValidDecision(task):
+            temp.append(task) #add valid tasks to filtered list.
+
+    return temp
+
+# Define the main function for decision-making on queries.
+def FirstLayerDMM(prompt: str = "test"):
+    # Add the user's query to the messages list.
+    messages.append({"role": "user", "content": f"{prompt}"})
+
+    # Resolve plain commands like 'open youtube' locally without a Cohere round trip.
+    local = match_intent(prompt)
+    if local:
+        return local
+
+    # Reuse the decision for a phrasing we have already classified.
+    cached = decision_cache.get(prompt)
+    if cached:
+        LogDecision(prompt, cached, "cache")  # keeps the usage history complete for the prefetcher
+        return cached
+
+    # Confident general/realtime questions are answered by the local classifier.
+    predicted = classify(prompt)
+    if predicted:
+        LogDecision(prompt, predicted, "local")
+        return predicted
+
+    started = time.perf_counter()
+    if DMMMode == "structured":
+        response = TryStructuredDMM(prompt)
+        if response is None:
+            return FallbackDecisions(prompt)
+        decision_cache.put(prompt, response)
+        LogDecision(prompt, response, "remote", time.perf_counter() - started)
+        return response
+
+    # Create a streaming chat session with the Cohere model.
+    stream = OpenDMMStream(prompt)
+
+    # Initialize an empty string to store the generated response.
+    response = ""
+
+    # Iterate over events in the stream and capture text generation events.
+    for event in stream:
+        if event.event_type == "text-generation":
+            response += event.text
+
+    response = ParseDMMText(response)
+
+    # if the model echoed the '(query)' placeholder, ask once more in structured mode instead of recursing.
+    if any("(query)" in task for task in response):
+        response = TryStructuredDMM(prompt)
+        if response is None:
+            return FallbackDecisions(prompt)
+
+    decision_cache.put(prompt, response)  # remember this classification for next time.
+    LogDecision(prompt, response, "remote", time.perf_counter() - started)
+    return response #return the filtered response
+
+# Streaming variant: yield each decision the moment its trailing comma arrives,
+# so callers can start work while the classifier is still generating.
+def FirstLayerDMMStream(prompt: str = "test"):
+    messages.append({"role": "user", "content": f"{prompt}"})
+
+    local = match_intent(prompt)
+    if local:
+        yield from local
+        return
+
+    cached = decision_cache.get(prompt)
+    if cached:
+        LogDecision(prompt, cached, "cache")
+        yield from cached
+        return
+
+    predicted = classify(prompt)
+    if predicted:
+        LogDecision(prompt, predicted, "local")
+        yield from predicted
+        return
+
+    started = time.perf_counter()
+    # A JSON reply can't be split before it is complete.
+    if DMMMode == "structured":
+        decisions = TryStructuredDMM(prompt)
+        if decisions is None:
+            yield from FallbackDecisions(prompt)
+            return
+        decision_cache.put(prompt, decisions)
+        LogDecision(prompt, decisions, "remote", time.perf_counter() - started)
+        yield from decisions
+        return
+
+    decisions = []
+    placeholder = False
+    buffer = ""
+    for event in OpenDMMStream(prompt):
+        if event.event_type != "text-generation":
+            continue
+        buffer += event.text.replace("\n", "")
+
+        # Everything before the last comma is a finished decision.
+        while "," in buffer:
+            task, buffer = buffer.split(",", 1)
+            task = ValidDecision(task)
+            if task and "(query)" in task:
+                placeholder = True
+            elif task:
+                decisions.append(task)
+                yield task
+
+    # The last decision has no trailing comma.
+    task = ValidDecision(buffer)
+    if task and "(query)" in task:
+        placeholder = True
+    elif task:
+        decisions.append(task)
+        yield task
+
+    # A '(query)' echo hides a decision: one bounded structured call fills it in, as in
+    # FirstLayerDMM. Decisions already yielded are not yielded (and run) twice.
+    if placeholder:
+        structured = TryStructuredDMM(prompt)
+        if structured is None:
+            # the list is incomplete; answer with what we have, but don't cache or log it
+            yield from FallbackDecisions(prompt)
+            return
+        seen = {d.lower() for d in decisions}
+        for task in structured:
+            if task.lower() not in seen:
+                seen.add(task.lower())
+                decisions.append(task)
+                yield task
+
+    if decisions:
+        decision_cache.put(prompt, decisions)
+        LogDecision(prompt, decisions, "remote", time.perf_counter() - started)
 
 #entry point for the script .
 if __name__ == "__main__":
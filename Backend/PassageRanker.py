@@ -0,0 +1,136 @@
+import re, math, time, traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from bs4 import BeautifulSoup
+from dotenv import dotenv_values
+from Backend.Clients import ConnectTimeout, page_client
+from Backend.ContextWindow import count_tokens
+
+# Load environment variables
+env_vars = dotenv_values(".env")
+FetchDeadline = float(env_vars.get("PageFetchDeadline") or 3)    # seconds for all pages together
+MaxPageBytes = int(env_vars.get("PageMaxBytes") or 1_500_000)
+PassageWords = int(env_vars.get("PassageWords") or 120)
+PassageOverlap = int(env_vars.get("PassageOverlap") or 30)
+TopPassages = int(env_vars.get("PassageTopK") or 5)
+PassageTokenBudget = int(env_vars.get("PassageTokenBudget") or 1200)
+
+useragent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Safari/537.36'
+
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="PageFetch")
+
+
+# -------- Fetching --------
+def fetch_page(url: str, ends: float = None):
+    """
+    HTML of one page, or None for non-HTML, failed and late responses. The whole
+    fetch, not just each socket read, must finish by ends (a time.monotonic() value,
+    FetchDeadline from now by default) and is never retried, so the worker is free
+    again once fetch_pages stops waiting for it.
+    """
+    import httpx
+    ends = ends or time.monotonic() + FetchDeadline
+    left = ends - time.monotonic()
+    if left <= 0:
+        return None  # waited in the pool queue past the deadline
+    timeout = httpx.Timeout(left, connect=min(ConnectTimeout, left))
+    with page_client().stream("GET", url, headers={"User-Agent": useragent}, timeout=timeout) as response:
+        if response.status_code != 200 or "html" not in response.headers.get("Content-Type", ""):
+            return None
+        # iter_bytes yields each read as it arrives, so a page that trickles in is cut off on time
+        body = bytearray()
+        for piece in response.iter_bytes():
+            body += piece
+            if len(body) >= MaxPageBytes or time.monotonic() > ends:
+                break
+        if time.monotonic() > ends:
+            return None  # fetch_pages has stopped waiting for this page
+        return bytes(body[:MaxPageBytes]).decode(response.encoding or "utf-8", errors="ignore")
+
+def fetch_pages(urls: list, deadline: float = FetchDeadline):
+    """Fetch pages concurrently; whatever hasn't arrived by the deadline is left out."""
+    ends = time.monotonic() + deadline
+    futures = {_pool.submit(fetch_page, url, ends): url for url in urls}
+    done, _ = wait(futures, timeout=deadline)
+    pages = {}
+    for future in done:
+        try:
+            html = future.result()
+            if html:
+                pages[futures[future]] = html
+        except Exception:
+            traceback.print_exc()
+    return pages
+
+
+# -------- Extraction --------
+_NOISE = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe", "button"]
+
+def extract_text(html: str) -> str:
+    """Main readable text of a page: paragraphs, list items and headings of <article>/<main> when present."""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(_NOISE):
+        tag.decompose()
+    root = soup.find("article") or soup.find("main") or soup.body or soup
+    blocks = [el.get_text(" ", strip=True) for el in root.find_all(["h1", "h2", "h3", "p", "li", "td"])]
+    blocks = [b for b in blocks if len(b.split()) >= 5]  # drop menu items and captions
+    return re.sub(r"\s+", " ", " ".join(blocks)).strip()
+
+def chunk(text: str, words: int = PassageWords, overlap: int = PassageOverlap):
+    tokens = text.split()
+    step = max(1, words - overlap)
+    return [" ".join(tokens[i:i + words]) for i in range(0, max(1, len(tokens) - overlap), step) if tokens[i:i + words]]
+
+
+# -------- Ranking --------
+_STOPWORDS = {"a", "an", "the", "is", "are", "was", "were", "of", "to", "in", "on", "for", "and", "or",
+              "what", "who", "how", "why", "when", "where", "which", "do", "does", "tell", "me", "about"}
+
+def _terms(text: str):
+    return [w for w in re.findall(r"\w+", text.lower()) if w not in _STOPWORDS]
+
+def bm25(query: str, passages: list, k1: float = 1.5, b: float = 0.75):
+    """Okapi BM25 score of every passage against the query."""
+    docs = [Counter(_terms(p)) for p in passages]
+    if not docs:
+        return []
+    avg_len = sum(sum(d.values()) for d in docs) / len(docs) or 1
+    df = Counter(t for d in docs for t in d)
+    n = len(docs)
+    scores = []
+    for d in docs:
+        length = sum(d.values())
+        score = 0.0
+        for t in set(_terms(query)):
+            tf = d.get(t, 0)
+            if tf:
+                idf = math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        scores.append(score)
+    return scores
+
+
+def best_passages(query: str, results: list, top_k: int = TopPassages, token_budget: int = PassageTokenBudget):
+    """Fetch the result pages and return the top passages as [{"title", "url", "text"}] within the budget."""
+    pages = fetch_pages([r["url"] for r in results if r.get("url")])
+    titles = {r.get("url"): r.get("title", "") for r in results}
+
+    candidates = []
+    for url, html in pages.items():
+        try:
+            for text in chunk(extract_text(html)):
+                candidates.append({"title": titles.get(url, ""), "url": url, "text": text})
+        except Exception:
+            traceback.print_exc()
+
+    scored = sorted(zip(bm25(query, [c["text"] for c in candidates]), range(len(candidates))), reverse=True)
+    chosen, used = [], 0
+    for score, i in scored:
+        if score <= 0 or len(chosen) >= top_k:
+            break
+        cost = count_tokens(candidates[i]["text"])
+        if used + cost > token_budget:
+            continue
+        chosen.append(candidates[i])
+        used += cost
+    return chosen
@@ -0,0 +1,268 @@
+import os, sys, json, time, tempfile, threading, traceback
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from dotenv import dotenv_values
+import config
+from Backend.IntentClassifier import log_path
+from Backend.SearchCache import normalize, query_class, QUERY_CLASSES
+
+# Load environment variables
+env_vars = dotenv_values(".env")
+PrefetchLead = float(env_vars.get("PrefetchLeadMinutes") or 10)   # run this long before the usual time
+PrefetchMinDays = int(env_vars.get("PrefetchMinDays") or 3)         # distinct days before a habit counts
+PrefetchLookback = int(env_vars.get("PrefetchLookbackDays") or 14)
+PrefetchMaxPerHour = int(env_vars.get("PrefetchMaxPerHour") or 4)
+PrefetchMaxPerDay = int(env_vars.get("PrefetchMaxPerDay") or 20)
+PollSeconds = 30
+RelearnSeconds = 3600
+ClusterGap = 30  # minutes between asks that still count as the same time of day
+
+# -------- Paths --------
+def _data_dir():
+    d = os.path.join(os.getcwd(), "Data")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def _stats_path():
+    return os.path.join(_data_dir(), "PrefetchStats.json")
+
+
+def _minute_of_day(ts: float) -> int:
+    t = datetime.fromtimestamp(ts)
+    return t.hour * 60 + t.minute
+
+
+# -------- Learning --------
+def load_asks(path: str = None, now: float = None, lookback_days: int = PrefetchLookback):
+    """(uid, query, ts) for every realtime decision in the DMM log within the lookback window."""
+    path = path or log_path()
+    since = (now or time.time()) - lookback_days * 86400
+    asks = []
+    if not os.path.exists(path):
+        return asks
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if not row.get("uid") or (row.get("ts") or 0) < since:
+                continue
+            for d in row.get("decisions") or []:
+                if d.startswith("realtime "):
+                    asks.append((row["uid"], d[len("realtime "):].strip(), row["ts"]))
+    return asks
+
+def learn_patterns(asks, min_days: int = PrefetchMinDays):
+    """
+    Per user, the realtime questions asked around the same time of day on at least
+    min_days different days: {uid: [{"query", "key", "minute", "days"}]}.
+    """
+    by_key = defaultdict(list)
+    for uid, query, ts in asks:
+        by_key[(uid, normalize(query))].append((_minute_of_day(ts), datetime.fromtimestamp(ts).date(), query))
+
+    patterns = defaultdict(list)
+    for (uid, key), seen in by_key.items():
+        seen.sort()
+        cluster = [seen[0]]
+        for item in seen[1:] + [None]:
+            if item is not None and item[0] - cluster[-1][0] <= ClusterGap:
+                cluster.append(item)
+                continue
+            days = {d for _, d, _ in cluster}
+            if len(days) >= min_days:
+                minutes = sorted(m for m, _, _ in cluster)
+                patterns[uid].append({
+                    "query": cluster[-1][2], "key": key,
+                    "minute": minutes[len(minutes) // 2], "days": len(days),
+                })
+            cluster = [item] if item is not None else []
+    return dict(patterns)
+
+
+# -------- Prefetcher --------
+class Prefetcher:
+    """
+    Answers a user's habitual realtime questions shortly before they usually ask
+    them. take() hands the answer out once, while it is still fresh.
+    """
+
+    def __init__(self, lead_minutes: float = PrefetchLead, max_per_hour: int = PrefetchMaxPerHour,
+                 max_per_day: int = PrefetchMaxPerDay, answer=None):
+        self.lead = lead_minutes * 60
+        self.max_per_hour = max_per_hour
+        self.max_per_day = max_per_day
+        self._answer = answer
+        self.patterns = {}
+        self.learned_at = 0
+        self.answers = {}                  # (uid, key) -> {"answer", "ts", "expires"}
+        self.done = set()                  # (uid, key, date, minute) already prefetched
+        self.runs = defaultdict(deque)     # uid -> timestamps of recent prefetches
+        self.metrics = {"prefetched": 0, "hits": 0, "misses": 0, "wasted": 0, "capped": 0, "failed": 0}
+        self._stats_dirty = False          # saved by the scheduler thread, never on the query path
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    # ----- Timing -----
+    def _lead_for(self, key: str) -> float:
+        fresh, _ = QUERY_CLASSES.get(query_class(key), QUERY_CLASSES["default"])
+        return min(self.lead, fresh)  # a 2-minute score should not be fetched 10 minutes early
+
+    def _fresh_for(self, key: str) -> float:
+        return QUERY_CLASSES.get(query_class(key), QUERY_CLASSES["default"])[0]
+
+    def _occurrence(self, pattern: dict, now: float):
+        """Date of the upcoming ask if now is inside its prefetch window, else None."""
+        minute_now = _minute_of_day(now) + datetime.fromtimestamp(now).second / 60
+        ahead = (pattern["minute"] - minute_now) % 1440  # modulo a day: 23:55 is 10 minutes before 00:05
+        if not 0 < ahead <= self._lead_for(pattern["key"]) / 60:
+            return None
+        return (datetime.fromtimestamp(now) + timedelta(minutes=ahead)).date()
+
+    def due(self, uid: str, now: float = None):
+        """(pattern, date) of uid whose prefetch window (lead before the usual minute) is open now."""
+        now = now or time.time()
+        due = []
+        for p in self.patterns.get(uid, []):
+            day = self._occurrence(p, now)
+            if day and (uid, p["key"], day, p["minute"]) not in self.done:
+                due.append((p, day))
+        return due
+
+    def _within_cap(self, uid: str, now: float) -> bool:
+        runs = self.runs[uid]
+        while runs and now - runs[0] >= 86400:
+            runs.popleft()
+        last_hour = sum(1 for t in runs if now - t < 3600)
+        return last_hour < self.max_per_hour and len(runs) < self.max_per_day
+
+    # ----- Running -----
+    def _run_one(self, uid: str, pattern: dict):
+        try:
+            answer = self._answer or self._default_answer()
+            text = answer(pattern["query"])
+            now = time.time()
+            with self._lock:
+                self.answers[(uid, pattern["key"])] = {
+                    "answer": text, "ts": now,
+                    "expires": now + self._lead_for(pattern["key"]) + self._fresh_for(pattern["key"]),
+                }
+                self.metrics["prefetched"] += 1
+        except Exception:
+            traceback.print_exc()
+            with self._lock:
+                self.metrics["failed"] += 1
+        self._stats_dirty = True
+
+    def _default_answer(self):
+        from Backend.RealTimeSearchEngine import PrefetchAnswer
+        return PrefetchAnswer
+
+    def tick(self, now: float = None):
+        """One scheduler pass for the signed-in user."""
+        now = now or time.time()
+        uid = config.FirebaseUID
+        if not uid:
+            return
+        if now - self.learned_at >= RelearnSeconds:
+            self.learn(now=now)
+
+        today = datetime.fromtimestamp(now).date()
+        with self._lock:
+            self._expire(now)
+            self.done = {d for d in self.done if d[2] >= today}
+            started = []
+            for p, day in self.due(uid, now):
+                self.done.add((uid, p["key"], day, p["minute"]))
+                if (uid, p["key"]) in self.answers:
+                    continue
+                if not self._within_cap(uid, now):
+                    self.metrics["capped"] += 1
+                    continue
+                self.runs[uid].append(now)
+                started.append(p)
+
+        for p in started:
+            threading.Thread(target=self._run_one, args=(uid, p), daemon=True, name="Prefetch").start()
+
+    def learn(self, path: str = None, now: float = None):
+        patterns = learn_patterns(load_asks(path, now))
+        with self._lock:
+            self.patterns = patterns
+            self.learned_at = now or time.time()
+        return patterns
+
+    def _loop(self):
+        while not self._stop.wait(PollSeconds):
+            try:
+                self.tick()
+            except Exception:
+                traceback.print_exc()
+            if self._stats_dirty:
+                self._save_stats()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="PrefetchScheduler")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._stats_dirty:
+            self._save_stats()
+
+    # ----- Serving -----
+    def _expire(self, now: float):
+        for k in [k for k, v in self.answers.items() if v["expires"] <= now]:
+            del self.answers[k]
+            self.metrics["wasted"] += 1
+
+    def take(self, query: str, uid: str = None):
+        """The prefetched answer for this question, once, if it is still fresh; else None."""
+        uid = uid or config.FirebaseUID
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self.answers.pop((uid, normalize(query)), None)
+            self.metrics["hits" if entry else "misses"] += 1
+        self._stats_dirty = True
+        return entry["answer"] if entry else None
+
+    def stats(self):
+        with self._lock:
+            m = dict(self.metrics)
+        asked = m["hits"] + m["misses"]
+        m["hit_rate"] = round(m["hits"] / asked, 3) if asked else 0.0
+        m["precision"] = round(m["hits"] / m["prefetched"], 3) if m["prefetched"] else 0.0
+        return m
+
+    def _save_stats(self):
+        self._stats_dirty = False
+        path = _stats_path()
+        try:
+            fd, tmp = tempfile.mkstemp(prefix="PrefetchStats-", suffix=".tmp", dir=os.path.dirname(path))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.stats(), f)
+            os.replace(tmp, path)
+        except Exception:
+            traceback.print_exc()
+
+
+# Shared instance: started by main, consulted by RealtimeSearchEngine.
+prefetcher = Prefetcher()
+
+
+# -------- CLI --------
+# python -m Backend.Prefetch [log.jsonl]  -> prints the learned per-user schedule
+if __name__ == "__main__":
+    patterns = learn_patterns(load_asks(sys.argv[1] if len(sys.argv) > 1 else None))
+    for uid, items in patterns.items():
+        print(uid)
+        for p in sorted(items, key=lambda p: p["minute"]):
+            print(f"  {p['minute'] // 60:02d}:{p['minute'] % 60:02d}  {p['query']}  ({p['days']} days)")
+    if not patterns:
+        print("No recurring realtime questions yet.")
@@ -1,12 +1,15 @@
 from googlesearch import search
 from dotenv import dotenv_values
-from groq import Groq
-import datetime, traceback, config
-import pyrebase
-from firebaseConfig import firebaseConfig
+import asyncio, datetime, traceback, config
+from Backend.ContextWindow import context_window, messages_tokens
+from Backend.Clients import firebase_app, groq_client, async_groq_client, llm_slots
+from Backend import FirebaseAsync
+from Backend.SearchCache import search_cache
+from Backend.PassageRanker import best_passages
+from Backend.Prefetch import prefetcher
 
 # Initialize Firebase
-firebase = pyrebase.initialize_app(firebaseConfig)
+firebase = firebase_app()
 db = firebase.database()
 
 # Load environment variables
@@ -14,15 +17,22 @@ env_vars = dotenv_values(".env")
 Assistantname = env_vars.get("Assistantname", "Kashi AI")
 GroqAPIKey = env_vars.get("GroqAPIKey")
 
-# Groq client
-client = Groq(api_key=GroqAPIKey)
+# Groq client (shared, pooled)
+client = groq_client()
 
 # System instruction
 System = f"""Hello, I am {config.Username}, You are a very accurate and advanced AI chatbot named {Assistantname} which has real-time up-to-date information from the internet.
 *** Provide Answers In a Professional Way, make sure to add full stops, commas, question marks, and use proper grammar.***
 *** Just answer the question from the provided data in a professional way. ***"""
 
-SystemChatBot = [{"role": "system", "content": System}]
+# A tuple, so no request can leak its search results into another one's prompt.
+SystemChatBot = ({"role": "system", "content": System},)
+
+# How many realtime sub-queries of one request may search and generate at once.
+RealtimeConcurrency = int(env_vars.get("RealtimeConcurrency") or 3)
+
+# Completion size of every search answer; the prompt is fitted to leave it room.
+SearchMaxTokens = 2048
 
 # ----------------- Firebase Helpers -----------------
 def get_user_chatlog():
@@ -46,12 +56,69 @@ def append_global_chat(role, content):
     except Exception:
         traceback.print_exc()
 
+# Parallel searches and general answers finish in any order; each commits its exchange
+# against the latest chatlog under the same lock as Chatbot's commits.
+def commit_exchange(prompt, answer):
+    with FirebaseAsync.path_lock(f"users/{config.FirebaseUID}/chatlog"):
+        messages = get_user_chatlog()
+        messages += [{"role": "user", "content": prompt}, {"role": "assistant", "content": answer}]
+        save_user_chatlog(messages)
+    append_global_chat("user", prompt)
+    append_global_chat("assistant", answer)
+
+async def get_user_chatlog_async():
+    try:
+        data = await FirebaseAsync.get(f"users/{config.FirebaseUID}/chatlog", config.FirebaseToken)
+        return data if data else []
+    except Exception:
+        traceback.print_exc()
+        return []
+
+async def save_user_chatlog_async(messages):
+    try:
+        await FirebaseAsync.set(f"users/{config.FirebaseUID}/chatlog", messages, config.FirebaseToken)
+    except Exception:
+        traceback.print_exc()
+
+async def append_global_chat_async(role, content):
+    try:
+        entry = {"uid": config.FirebaseUID, "username": config.Username, "role": role, "content": content}
+        await FirebaseAsync.push("global/chatlog", entry, config.FirebaseToken)
+    except Exception:
+        traceback.print_exc()
+
+async def commit_exchange_async(prompt, answer):
+    async with FirebaseAsync.lock(f"users/{config.FirebaseUID}/chatlog"):
+        messages = await get_user_chatlog_async()
+        messages += [{"role": "user", "content": prompt}, {"role": "assistant", "content": answer}]
+        await save_user_chatlog_async(messages)
+    await append_global_chat_async("user", prompt)
+    await append_global_chat_async("assistant", answer)
+
 # ----------------- Utilities -----------------
+def FetchSearchResults(query):
+    """Scrape Google once and rank passages from the result pages; plain dicts so it can be cached."""
+    results = [{"title": r.title, "description": r.description, "url": r.url}
+               for r in search(query, advanced=True, num_results=3)]
+    try:
+        passages = best_passages(query, results)
+    except Exception:
+        traceback.print_exc()
+        passages = []  # the titles and descriptions alone still make an answer
+    return {"results": results, "passages": passages}
+
 def GoogleSearch(query):
-    results = list(search(query, advanced=True, num_results=3))
+    # cached per query class; identical concurrent searches share one scrape
+    found = search_cache.get_or_fetch(query, FetchSearchResults)
+    if isinstance(found, list):
+        found = {"results": found, "passages": []}  # entry cached before passages were added
     Answer = f"The search results for '{query}' are:\n[start]\n"
-    for i in results:
-        Answer += f"Title: {i.title}\nDescription: {i.description}\n\n"
+    for i in found["results"]:
+        Answer += f"Title: {i['title']}\nDescription: {i['description']}\n\n"
+    if found["passages"]:
+        Answer += "Relevant passages from these pages:\n"
+        for n, p in enumerate(found["passages"], 1):
+            Answer += f"[{n}] ({p['title']}) {p['text']}\n\n"
     Answer += "[end]"
     return Answer
 
@@ -71,47 +138,109 @@ def Information():
         f"Time: {now.strftime('%H')} hours : {now.strftime('%M')} minutes : {now.strftime('%S')} seconds.\n"
     )
 
+def BuildSearchPrompt(results, messages):
+    """A fresh prompt for one search: system prompt, its own results and the time, then the fitted history."""
+    fixed = [*SystemChatBot, {"role": "user", "content": results}, {"role": "system", "content": Information()}]
+    history = context_window.fit(messages, reserved_tokens=messages_tokens(fixed), user_key=config.FirebaseUID,
+                                 completion_tokens=SearchMaxTokens)
+    return fixed + history
+
 # ----------------- Main Engine -----------------
-def RealtimeSearchEngine(prompt):
-    global SystemChatBot
+def RealtimeSearchEngineStream(prompt):
+    """Yield the answer as text deltas; the reply is saved once the stream is exhausted."""
+    # answered ahead of time because the user asks this every day around now
+    prefetched = prefetcher.take(prompt)
+    if prefetched is not None:
+        yield prefetched
+        commit_exchange(prompt, prefetched)
+        return
+
+    # load chatlog for this user
+    messages = get_user_chatlog()
+
+    # add user query (saved together with the reply)
+    messages.append({"role": "user", "content": prompt})
+
+    # Groq API call, with this search's results and the history trimmed to fit next to them
+    completion = client.chat.completions.create(
+        model="llama3-70b-8192",
+        messages=BuildSearchPrompt(GoogleSearch(prompt), messages),
+        max_tokens=SearchMaxTokens,
+        temperature=0.7,
+        top_p=1,
+        stream=True
+    )
+
+    Answer = ""
     try:
-        # load chatlog for this user
-        messages = get_user_chatlog()
+        for chunk in completion:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                delta = delta.replace("</s>", "")
+                Answer += delta
+                yield delta
+    finally:
+        completion.close()
+
+    # save the exchange
+    commit_exchange(prompt, Answer.strip())
+
+async def RealtimeSearchEngineAsync(prompt):
+    """
+    RealtimeSearchEngine on async Groq and Firebase calls; a timeout cancels the
+    in-flight request. The search results go into this request's prompt only.
+    """
+    try:
+        prefetched = prefetcher.take(prompt)
+        if prefetched is not None:
+            await commit_exchange_async(prompt, prefetched)
+            return AnswerModifier(prefetched)
 
-        # add user query
+        messages = await get_user_chatlog_async()
         messages.append({"role": "user", "content": prompt})
-        save_user_chatlog(messages)
-        append_global_chat("user", prompt)
 
-        # add Google results
-        SystemChatBot.append({"role": "user", "content": GoogleSearch(prompt)})
-
-        # Groq API call
-        completion = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=SystemChatBot + [{"role": "system", "content": Information()}] + messages,
-            max_tokens=2048,
-            temperature=0.7,
-            top_p=1,
-            stream=True
-        )
+        results = await asyncio.to_thread(GoogleSearch, prompt)
 
         Answer = ""
-        for chunk in completion:
-            if chunk.choices[0].delta.content:
-                Answer += chunk.choices[0].delta.content
-
-        Answer = Answer.replace("</s>", "").strip()
+        async with llm_slots():
+            completion = await async_groq_client().chat.completions.create(
+                model="llama3-70b-8192",
+                messages=BuildSearchPrompt(results, messages),
+                max_tokens=SearchMaxTokens,
+                temperature=0.7,
+                top_p=1,
+                stream=True
+            )
+            try:
+                async for chunk in completion:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        Answer += delta.replace("</s>", "")
+            finally:
+                await completion.close()
+
+        await commit_exchange_async(prompt, Answer.strip())
+        return AnswerModifier(Answer.strip())
 
-        # save assistant reply
-        messages.append({"role": "assistant", "content": Answer})
-        save_user_chatlog(messages)
-        append_global_chat("assistant", Answer)
+    except Exception as e:
+        traceback.print_exc()
+        return f"Realtime search failed: {e}"
 
-        # cleanup SystemChatBot (remove Google results injection)
-        SystemChatBot.pop()
+def PrefetchAnswer(prompt):
+    """Answer a predicted question ahead of time; nothing is saved until the user actually asks."""
+    messages = get_user_chatlog() + [{"role": "user", "content": prompt}]
+    completion = client.chat.completions.create(
+        model="llama3-70b-8192",
+        messages=BuildSearchPrompt(GoogleSearch(prompt), messages),
+        max_tokens=SearchMaxTokens,
+        temperature=0.7,
+        top_p=1,
+    )
+    return completion.choices[0].message.content.replace("</s>", "").strip()
 
-        return AnswerModifier(Answer)
+def RealtimeSearchEngine(prompt):
+    try:
+        return AnswerModifier("".join(RealtimeSearchEngineStream(prompt)).strip())
 
     except Exception as e:
         traceback.print_exc()
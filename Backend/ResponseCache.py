@@ -0,0 +1,247 @@
+import os, re, json, math, time, atexit, threading, traceback
+from collections import OrderedDict, Counter, defaultdict
+from dotenv import dotenv_values
+
+# Load environment variables
+env_vars = dotenv_values(".env")
+SimilarityThreshold = float(env_vars.get("ResponseCacheThreshold") or 0.97)
+ResponseCacheTTL = float(env_vars.get("ResponseCacheTTL") or 24 * 3600)
+ResponseCacheSize = int(env_vars.get("ResponseCacheSize") or 5000)
+SaveDelay = 2  # seconds; changes within this window share one rewrite of the cache file
+
+# -------- Paths --------
+def _data_dir():
+    d = os.path.join(os.getcwd(), "Data")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def _cache_path():
+    return os.path.join(_data_dir(), "ResponseCache.json")
+
+
+# -------- Query Analysis --------
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "in", "on", "for", "and",
+    "do", "does", "did", "can", "could", "you", "tell", "me", "about", "please", "explain", "give",
+}
+
+# "how" and "why", "5 + 3" and "5 - 3" ask different things; a near match must agree on these.
+QUESTION_WORDS = {"what", "who", "how", "why", "when", "where", "which", "whose", "whom", "not", "no", "to", "from", "or"}
+OPERATORS = set("+-*/%^=<>×÷")
+
+# Answers to these change with the clock, so they are never cached.
+TIME_SENSITIVE = {
+    "time", "date", "day", "today", "tonight", "tomorrow", "yesterday", "now", "current", "currently",
+    "latest", "recent", "recently", "news", "weather", "score", "price", "stock", "live", "this week",
+    "this year", "this month",
+}
+
+# These only make sense against the conversation so far ("who is he?", "tell me more").
+HISTORY_DEPENDENT = {
+    "he", "she", "him", "her", "his", "hers", "they", "them", "their", "it", "its", "that", "this",
+    "those", "these", "there", "more", "again", "above", "previous", "earlier", "last", "continue",
+    "same", "also", "else", "another", "other", "then",
+}
+
+
+def _words(text: str):
+    return re.findall(r"[a-z0-9']+", str(text or "").lower())
+
+def _tokens(text: str):
+    """Words and arithmetic operators, in order."""
+    return re.findall(r"[a-z0-9']+|[+\-*/%^=<>×÷]", str(text or "").lower())
+
+def normalize(query: str) -> str:
+    return " ".join(_tokens(query))
+
+def signature(query: str) -> tuple:
+    """Question words, numbers and operators in order; near matches must share it exactly."""
+    return tuple(t for t in _tokens(query) if t in QUESTION_WORDS or t in OPERATORS or t.isdigit())
+
+def is_cacheable(query: str) -> bool:
+    words = _words(query)
+    joined = " ".join(words)
+    if not words or len(words) < 3:
+        return False  # "ok", "thanks", "and him?" are conversation, not questions
+    if any(w in TIME_SENSITIVE for w in words) or any(" " in t and t in joined for t in TIME_SENSITIVE):
+        return False
+    return not any(w in HISTORY_DEPENDENT for w in words)
+
+def scope_for(user_id: str = None) -> str:
+    # Every answer is generated with the asker's memory, history and name, so even
+    # "suggest a dinner recipe" is personal; answers are only ever served back to the same user.
+    return f"user:{user_id or 'anonymous'}"
+
+
+def embed(query: str) -> dict:
+    """Sparse, L2-normalized bag of content words, word bigrams (for order) and character trigrams."""
+    tokens = _tokens(query)
+    words = [w for w in tokens if w not in STOPWORDS]
+    vector = Counter({f"w:{w}": 2.0 for w in words})
+    vector.update({f"b:{a} {b}": 2.0 for a, b in zip(tokens, tokens[1:])})
+    for w in words:
+        padded = f" {w} "
+        vector.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {k: v / norm for k, v in vector.items()}
+
+def similarity(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+# -------- Response Cache --------
+class ResponseCache:
+    """
+    Similarity-keyed cache of general ChatBot answers, scoped per user, with
+    TTL expiry and LRU eviction. Time-sensitive and history-dependent
+    questions are bypassed entirely.
+    """
+
+    def __init__(self, threshold: float = SimilarityThreshold, ttl: float = ResponseCacheTTL,
+                 max_entries: int = ResponseCacheSize, path: str = None):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path or _cache_path()
+        self.entries = OrderedDict()      # (scope, normalized query) -> entry
+        self.index = defaultdict(set)     # (scope, content word) -> keys
+        self.hits = self.misses = self.bypassed = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()   # one writer of the file at a time
+        self._timer = None
+        self._load()
+
+    # ----- Persistence -----
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+            now = time.time()
+            for row in rows:
+                if now - row["ts"] < self.ttl:
+                    self._insert(row["scope"], row["query"], row["answer"], row["ts"])
+        except Exception:
+            traceback.print_exc()
+            self.entries.clear()
+            self.index.clear()
+
+    def _schedule_save(self):
+        """Write the file shortly, on a timer thread; callers (some on the event loop) never wait for disk."""
+        if self._timer is None:
+            self._timer = threading.Timer(SaveDelay, self.save)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending changes now, e.g. on shutdown; nothing happens when there are none."""
+        if self._timer is not None:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            rows = [{"scope": scope, "query": q, "answer": e["answer"], "ts": e["ts"]}
+                    for (scope, q), e in self.entries.items()]
+        with self._save_lock:
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(rows, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except Exception:
+                traceback.print_exc()
+
+    # ----- Index Maintenance -----
+    def _content_words(self, query: str):
+        return {w for w in _tokens(query) if w not in STOPWORDS}
+
+    def _insert(self, scope, query, answer, ts):
+        key = (scope, normalize(query))
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = {"answer": answer, "ts": ts, "vector": embed(query), "signature": signature(query)}
+        for w in self._content_words(query):
+            self.index[(scope, w)].add(key)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        self.entries.pop(key, None)
+        scope, query = key
+        for w in self._content_words(query):
+            keys = self.index.get((scope, w))
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self.index[(scope, w)]
+
+    # ----- Cache API -----
+    def get(self, query: str, user_id: str = None):
+        """Cached answer for a sufficiently similar earlier question, else None."""
+        if not is_cacheable(query):
+            with self._lock:
+                self.bypassed += 1
+            return None
+
+        scope = scope_for(user_id)
+        vector = embed(query)
+        sig = signature(query)
+        now = time.time()
+        with self._lock:
+            candidates = set()
+            exact = (scope, normalize(query))
+            if exact in self.entries:
+                candidates.add(exact)
+            for w in self._content_words(query):
+                candidates |= self.index.get((scope, w), set())
+
+            best, best_score = None, 0.0
+            for key in candidates:
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                if now - entry["ts"] >= self.ttl:
+                    self._remove(key)
+                    continue
+                if key != exact and entry["signature"] != sig:
+                    continue
+                score = similarity(vector, entry["vector"])
+                if score > best_score:
+                    best, best_score = key, score
+
+            if best is None or (best != exact and best_score < self.threshold):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(best)
+            self.hits += 1
+            return self.entries[best]["answer"]
+
+    def put(self, query: str, answer: str, user_id: str = None):
+        if not answer or not is_cacheable(query):
+            return
+        with self._lock:
+            self._insert(scope_for(user_id), query, answer, time.time())
+            self._schedule_save()
+
+    def invalidate(self, user_id: str = None):
+        """Drop one user's scope; no user means the signed-out ("anonymous") scope, never everyone's."""
+        scope = scope_for(user_id)
+        with self._lock:
+            for key in [k for k in self.entries if k[0] == scope]:
+                self._remove(key)
+            self._schedule_save()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses, "bypassed": self.bypassed}
+
+
+# Shared instance used by ChatBot.
+response_cache = ResponseCache()
+atexit.register(response_cache.flush)
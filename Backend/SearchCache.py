@@ -0,0 +1,194 @@
+import os, re, json, time, atexit, threading, traceback
+from collections import OrderedDict
+from dotenv import dotenv_values
+
+# Load environment variables
+env_vars = dotenv_values(".env")
+SearchCacheSize = int(env_vars.get("SearchCacheSize") or 500)
+SaveDelay = 2  # seconds; fetches within this window share one rewrite of the cache file
+
+# (fresh seconds, extra seconds a stale entry may still be served while it is refreshed)
+QUERY_CLASSES = {
+    "live":    (120, 120),
+    "news":    (600, 600),
+    "weather": (1800, 1800),
+    "default": (6 * 3600, 6 * 3600),
+}
+
+# First match wins: "today's weather" is weather, not news.
+_CLASS_PATTERNS = [
+    ("live", re.compile(r"\b(score|scores|live|stock|stocks|share price|price of|bitcoin|crypto|sensex|nifty|match)\b")),
+    ("weather", re.compile(r"\b(weather|temperature|forecast|rain|raining|humidity|aqi|air quality)\b")),
+    ("news", re.compile(r"\b(news|headline|headlines|breaking|latest|today|tonight|yesterday|update|updates|election)\b")),
+]
+
+# -------- Paths --------
+def _data_dir():
+    d = os.path.join(os.getcwd(), "Data")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def _cache_path():
+    return os.path.join(_data_dir(), "SearchCache.json")
+
+
+def normalize(query: str) -> str:
+    query = re.sub(r"[^\w\s]", " ", str(query or "").lower())
+    return re.sub(r"\s+", " ", query).strip()
+
+def query_class(query: str) -> str:
+    text = normalize(query)
+    for name, pattern in _CLASS_PATTERNS:
+        if pattern.search(text):
+            return name
+    return "default"
+
+
+# -------- Search Cache --------
+class SearchCache:
+    """
+    Search results keyed by normalized query, with a TTL per query class.
+    Stale entries are served while one background refresh runs, and concurrent
+    misses for the same query share a single fetch.
+    """
+
+    def __init__(self, max_entries: int = SearchCacheSize, path: str = None, classes: dict = None):
+        self.max_entries = max_entries
+        self.path = path or _cache_path()
+        self.classes = classes or QUERY_CLASSES
+        self.entries = OrderedDict()   # key -> {"results": [...], "ts": float, "class": str}
+        self._inflight = {}            # key -> threading.Event of the fetch in progress
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()   # one writer of the file at a time
+        self._timer = None
+        self.hits = self.stale_hits = self.misses = self.coalesced = 0
+        self._load()
+
+    # ----- Persistence -----
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = OrderedDict(json.load(f))
+        except Exception:
+            traceback.print_exc()
+            self.entries = OrderedDict()
+
+    def _schedule_save(self):
+        """Write the file shortly, on a timer thread; concurrent searches never wait for disk."""
+        if self._timer is None:
+            self._timer = threading.Timer(SaveDelay, self.save)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending changes now, e.g. on shutdown; nothing happens when there are none."""
+        if self._timer is not None:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            rows = list(self.entries.items())
+        with self._save_lock:
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(rows, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except Exception:
+                traceback.print_exc()
+
+    # ----- Freshness -----
+    def _age_state(self, entry, now):
+        fresh, stale = self.classes.get(entry["class"], self.classes["default"])
+        age = now - entry["ts"]
+        if age < fresh:
+            return "fresh"
+        if age < fresh + stale:
+            return "stale"
+        return "expired"
+
+    # ----- Fetching -----
+    def _fetch(self, key, query, fetch, event):
+        """Run one fetch for key and publish the result; waiters are released either way."""
+        try:
+            results = fetch(query)
+            with self._lock:
+                self.entries[key] = {"results": results, "ts": time.time(), "class": query_class(query)}
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                self._schedule_save()
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def get_or_fetch(self, query: str, fetch):
+        """Return results for query, calling fetch(query) at most once per key at a time."""
+        key = normalize(query)
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(key)
+            state = self._age_state(entry, now) if entry else "expired"
+            if state != "expired":
+                self.entries.move_to_end(key)
+
+            if state == "fresh":
+                self.hits += 1
+                return entry["results"]
+
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+            if state == "stale":
+                self.stale_hits += 1
+                if leader:
+                    threading.Thread(target=self._refresh, args=(key, query, fetch, event), daemon=True, name="SearchRefresh").start()
+                return entry["results"]
+
+            if leader:
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            self._fetch(key, query, fetch, event)
+        else:
+            event.wait()
+
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            # the shared fetch failed; a follower tries once on its own rather than returning nothing
+            return fetch(query)
+        return entry["results"]
+
+    def _refresh(self, key, query, fetch, event):
+        try:
+            self._fetch(key, query, fetch, event)
+        except Exception:
+            traceback.print_exc()  # keep serving the stale copy
+
+    def invalidate(self, query: str = None):
+        with self._lock:
+            if query is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(normalize(query), None)
+            self._schedule_save()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits, "stale_hits": self.stale_hits,
+                    "misses": self.misses, "coalesced": self.coalesced}
+
+
+# Shared instance used by RealtimeSearchEngine.
+search_cache = SearchCache()
+atexit.register(search_cache.flush)
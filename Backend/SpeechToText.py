@@ -9,6 +9,7 @@ import time
 import mtranslate as mt
 import threading
 import tempfile
+from Backend.EventBus import bus, STATUS, USER_QUERY
 
 # Load environment variables from the .env file.
 env_vars = dotenv_values(".env")
@@ -185,16 +186,10 @@ def cleanup_driver():
             finally:
                 driver = None
 
-# Define the path for temporary files
-TempDirPath = os.path.join(current_dir, "Frontend", "Files")
-os.makedirs(TempDirPath, exist_ok=True)
-
-# function to set the assistant's status by writing it to a file
+# function to set the assistant's status by publishing it on the event bus
 def SetAssistantStatus(Status):
     try:
-        status_file = os.path.join(TempDirPath, 'Status.data')
-        with open(status_file, "w", encoding='utf-8') as file:
-            file.write(str(Status))
+        bus.publish(STATUS, Status)
     except Exception as e:
         print(f"Error setting assistant status: {e}")
 
@@ -242,26 +237,19 @@ def UniversalTranslator(Text):
 
 # function to perform speech recognition using the webdriver
 def SpeechRecognition():
-    user_query_path = os.path.join(TempDirPath, "UserQuery.data")
     max_retries = 3
     retry_count = 0
 
     while retry_count < max_retries:
         try:
             # 1) QUICK CHECK before starting voice (handles already-typed text)
-            if os.path.exists(user_query_path):
-                with open(user_query_path, "r", encoding="utf-8") as f:
-                    typed_text = f.read().strip()
-                if typed_text:
-                    # Clear the file after reading
-                    with open(user_query_path, "w", encoding="utf-8") as f:
-                        f.write("")
-                    
-                    if InputLanguage.lower().startswith("en"):
-                        return QueryModifier(typed_text)
-                    else:
-                        SetAssistantStatus("Translating...")
-                        return QueryModifier(UniversalTranslator(typed_text))
+            typed_text = (bus.take(USER_QUERY, 0) or "").strip()
+            if typed_text:
+                if InputLanguage.lower().startswith("en"):
+                    return QueryModifier(typed_text)
+                else:
+                    SetAssistantStatus("Translating...")
+                    return QueryModifier(UniversalTranslator(typed_text))
 
             # 2) Initialize driver if needed
             if not init_driver():
@@ -291,26 +279,20 @@ def SpeechRecognition():
             while timeout_counter < max_timeout:
                 try:
                     # Check for typed input first
-                    if os.path.exists(user_query_path):
-                        with open(user_query_path, "r", encoding="utf-8") as f:
-                            typed_text = f.read().strip()
-                        if typed_text:
-                            # Stop voice recognition cleanly
-                            try:
-                                end_button = driver.find_element(By.ID, "end")
-                                end_button.click()
-                            except Exception:
-                                pass
-                            
-                            # Clear the file
-                            with open(user_query_path, "w", encoding="utf-8") as f:
-                                f.write("")
-
-                            if InputLanguage.lower().startswith("en"):
-                                return QueryModifier(typed_text)
-                            else:
-                                SetAssistantStatus("Translating...")
-                                return QueryModifier(UniversalTranslator(typed_text))
+                    typed_text = (bus.take(USER_QUERY, 0) or "").strip()
+                    if typed_text:
+                        # Stop voice recognition cleanly
+                        try:
+                            end_button = driver.find_element(By.ID, "end")
+                            end_button.click()
+                        except Exception:
+                            pass
+
+                        if InputLanguage.lower().startswith("en"):
+                            return QueryModifier(typed_text)
+                        else:
+                            SetAssistantStatus("Translating...")
+                            return QueryModifier(UniversalTranslator(typed_text))
 
                     # Check for voice input
                     output_element = driver.find_element(By.ID, "output")
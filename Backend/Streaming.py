@@ -0,0 +1,44 @@
+import asyncio, threading
+
+# -------- Async Adapter --------
+async def iterate_in_thread(factory, *args, **kwargs):
+    """
+    Run a blocking generator in a worker thread and yield its items on the
+    event loop as they arrive. Exceptions raised by the generator are re-raised here.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def push(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass  # loop already closed, nobody is listening
+
+    def pump():
+        try:
+            generator = factory(*args, **kwargs)
+            for item in generator:
+                if stop.is_set():
+                    generator.close()
+                    break
+                push(item)
+        except Exception as e:
+            push(e)
+        finally:
+            push(done)
+
+    threading.Thread(target=pump, daemon=True, name=getattr(factory, "__name__", "Stream")).start()
+
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()  # the consumer went away; let the worker stop at the next item
@@ -1,6 +1,6 @@
 import pygame
 import random
-import asyncio
+from Backend.AsyncLoop import backend_loop
 import edge_tts
 import os
 import tempfile
@@ -192,16 +192,8 @@ def TTS(text, func=lambda r=None: True, lang="en"):
             
             # Generate audio file
             try:
-                # Create new event loop for this thread if needed
-                try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_closed():
-                        raise RuntimeError("Event loop is closed")
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
-                temp_audio_path = loop.run_until_complete(TextToAudioFile(text, lang=lang))
+                # Synthesize on the shared backend loop instead of a loop per thread
+                temp_audio_path = backend_loop.run(TextToAudioFile(text, lang=lang))
                 
             except Exception as e:
                 print(f"[TTS] Error generating audio: {e}")
@@ -1,5 +1,4 @@
 import os
-import requests
 import base64
 from PIL import Image
 import pytesseract
@@ -11,7 +10,7 @@ import docx
 import pandas as pd
 from io import BytesIO
 import json
-from groq import Groq
+from Backend.Clients import groq_client, http_session, http_timeout
 import traceback
 
 # Free OCR setup (you'll need to install Tesseract)
@@ -22,8 +21,8 @@ import traceback
 GROQ_API_KEY = get_key(".env", "GroqAPIKey")
 HUGGINGFACE_API_KEY = get_key(".env", "HUGGINGFACE_API_KEY")
 
-# Initialize Groq client
-groq_client = Groq(api_key=GROQ_API_KEY)
+# Shared Groq client (pooled, keep-alive)
+groq = groq_client()
 
 class VisionAnalyzer:
     def __init__(self):
@@ -133,7 +132,7 @@ class VisionAnalyzer:
             with open(image_path, "rb") as f:
                 data = f.read()
             
-            response = requests.post(API_URL, headers=headers, data=data, timeout=30)
+            response = http_session().post(API_URL, headers=headers, data=data, timeout=http_timeout(30))
             
             if response.status_code == 200:
                 result = response.json()
@@ -162,7 +161,7 @@ class VisionAnalyzer:
                 {"role": "user", "content": f"{combined_info}\n\nPlease analyze this information and answer: {user_question}"}
             ]
             
-            completion = groq_client.chat.completions.create(
+            completion = groq.chat.completions.create(
                 model="llama3-70b-8192",
                 messages=messages,
                 max_tokens=1024,
@@ -176,7 +175,7 @@ class VisionAnalyzer:
 
 class FileAnalyzer:
     def __init__(self):
-        self.groq_client = Groq(api_key=GROQ_API_KEY)
+        self.groq_client = groq
         
     def analyze_file(self, file_path, question="What is this file about?"):
         """Analyze different file types"""
@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import QApplication,QDesktopWidget, QMainWindow, QTextEdit,QHBoxLayout, QStackedWidget, QWidget, QLineEdit, QGridLayout, QVBoxLayout, QPushButton, QFrame, QLabel, QSizePolicy, QFileDialog
 from PyQt5.QtGui import QIcon, QPainter, QMovie, QColor, QTextCharFormat, QFont, QPixmap, QTextBlockFormat,QTextCursor
-from PyQt5.QtCore import Qt, QSize, QTimer, pyqtSignal
+from PyQt5.QtCore import Qt, QSize, QObject, pyqtSignal
 from dotenv import dotenv_values
 import sys
 import os
@@ -17,10 +17,10 @@ from PyQt5.QtWidgets import (
     QHBoxLayout, QMessageBox, QCheckBox
 )
 from PyQt5.QtCore import Qt
-import pyrebase
-from firebaseConfig import firebaseConfig
+from Backend.Clients import firebase_app
+from Backend.EventBus import bus, STATUS, RESPONSE, MIC, USER_QUERY
 
-firebase = pyrebase.initialize_app(firebaseConfig)
+firebase = firebase_app()
 auth = firebase.auth()
 db = firebase.database()
 
@@ -62,25 +62,19 @@ def QueryModifier(Query):
 
 
 def SetMicrophoneStatus(Command):
-    with open(rf"{TempDirPath}\Mic.data", "w", encoding="utf-8") as file:
-        file.write(Command)
+    bus.publish(MIC, Command)
 
 
 def GetMicrophoneStatus():
-    with open(rf"{TempDirPath}\Mic.data", "r", encoding="utf-8") as file:
-        Status = file.read()
-    return Status
+    return str(bus.latest(MIC, False))
 
 
 def SetAssistantStatus(Status):
-    with open(rf"{TempDirPath}\Status.data", "w", encoding="utf-8") as file:
-        file.write(Status)
+    bus.publish(STATUS, Status)
 
 
 def GetAssistantStatus():
-    with open(rf"{TempDirPath}\Status.data", "r", encoding="utf-8") as file:
-        Status = file.read()
-    return Status
+    return bus.latest(STATUS, "")
 
 def MicButtonInitialized():
     SetMicrophoneStatus("True")
@@ -101,8 +95,39 @@ def TempDirectoryPath(Filename):
 
 
 def ShowTextToScreen(Text):
-    with open(rf"{TempDirPath}\Responses.data", "w", encoding="utf-8") as file:
-        file.write(Text)
+    bus.publish(RESPONSE, Text)
+
+
+class BusBridge(QObject):
+    """
+    Re-emits event bus traffic as Qt signals. Events are published from backend
+    threads, so connected widgets receive them queued on the GUI thread.
+    """
+    status_changed = pyqtSignal(str)
+    response_shown = pyqtSignal(str)
+    mic_changed = pyqtSignal(bool)
+    user_query = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        signals = {STATUS: self.status_changed, RESPONSE: self.response_shown, MIC: self.mic_changed, USER_QUERY: self.user_query}
+        self._unsubscribe = [bus.subscribe(topic, lambda event, signal=signal: signal.emit(event.value))
+                             for topic, signal in signals.items()]
+
+    def close(self):
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe = []
+
+
+_bridge = None
+
+def bus_bridge():
+    """The shared BusBridge, created on first use."""
+    global _bridge
+    if _bridge is None:
+        _bridge = BusBridge()
+    return _bridge
 
 # class LoginWindow(QWidget):
 #     def __init__(self):
@@ -444,10 +469,12 @@ class ChatSection(QWidget):
         font.setPointSize(13)
         self.chat_text_edit.setFont(font)
 
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.LoadMessages)
-        self.timer.timeout.connect(self.SpeechRecogText)
-        self.timer.start(5)
+        # Update on bus events instead of polling; show what was published before this widget existed
+        bridge = bus_bridge()
+        bridge.response_shown.connect(self.LoadMessages)
+        bridge.status_changed.connect(self.SpeechRecogText)
+        self.LoadMessages()
+        self.SpeechRecogText()
 
         self.chat_text_edit.viewport().installEventFilter(self)
 
@@ -622,32 +649,28 @@ class ChatSection(QWidget):
                 QMessageBox.warning(self, "Unsupported File", 
                                 f"File type not supported.\n\nSupported: Images (jpg, png, etc.) and Documents (pdf, docx, txt, csv, xlsx)")
 
-    def LoadMessages(self):
+    def LoadMessages(self, messages=None):
         global old_chat_message
 
-        with open(TempDirectoryPath('Responses.data'), "r", encoding='utf-8') as file:
-            messages = file.read()
+        if messages is None:
+            messages = bus.latest(RESPONSE, "")
 
-            if None == messages:
-                pass
+        if None == messages:
+            pass
 
-            elif len(messages) <= 1:
-                pass
+        elif len(messages) <= 1:
+            pass
 
-            elif str(old_chat_message) == str(messages):
-                pass
+        elif str(old_chat_message) == str(messages):
+            pass
 
-            else:
-                self.addMessage(message=messages,color="White")
-                old_chat_message = messages
+        else:
+            self.addMessage(message=messages,color="White")
+            old_chat_message = messages
     
     def clear_chat_screen(self):
         self.chat_text_edit.clear()
-        try:
-            with open(TempDirectoryPath("Responses.data"), "w", encoding="utf-8") as f:
-                f.write("")  # empty it
-        except Exception as e:
-            print("[!] Could not clear Responses.data:", e)
+        ShowTextToScreen("")
 
     def clear_last_chat(self):
         cursor = self.chat_text_edit.textCursor()
@@ -661,10 +684,8 @@ class ChatSection(QWidget):
         cursor.deletePreviousChar()  # remove newline
 
 
-    def SpeechRecogText(self):
-        with open(TempDirectoryPath('Status.data'), "r", encoding='utf-8') as file:
-            messages = file.read()
-            self.label.setText(messages)
+    def SpeechRecogText(self, status=None):
+        self.label.setText(GetAssistantStatus() if status is None else status)
 
     def load_icon(self, path, width=60, height=60):
         pixmap = QPixmap(path)
@@ -692,9 +713,8 @@ class ChatSection(QWidget):
                 messages.append({"role": "user", "content": query})
                 self.save_user_chatlog(messages)
             
-            # Write to file for processing
-            with open(TempDirectoryPath("UserQuery.data"), "w", encoding="utf-8") as f:
-                f.write(query)
+            # Hand over for processing
+            bus.publish(USER_QUERY, query)
 
     def addMessage(self, message, color):
         cursor = self.chat_text_edit.textCursor()
@@ -740,14 +760,11 @@ class InitialScreen(QWidget):
         self.setFixedWidth(screen_width)
         self.setStyleSheet("background-color: black;")
 
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.SpeechRecogText)
-        self.timer.start(5)
+        bus_bridge().status_changed.connect(self.SpeechRecogText)
+        self.SpeechRecogText()
 
-    def SpeechRecogText(self):
-        with open(TempDirectoryPath('Status.data'), "r", encoding='utf-8') as file:
-            messages = file.read()
-            self.label.setText(messages)
+    def SpeechRecogText(self, status=None):
+        self.label.setText(GetAssistantStatus() if status is None else status)
 
 class MessageScreen(QWidget):
     def __init__(self, get_chatlog_func=None, save_chatlog_func=None, parent=None):
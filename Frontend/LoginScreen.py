@@ -8,11 +8,10 @@ from PyQt5.QtWidgets import (
     QHBoxLayout, QMessageBox, QCheckBox, QApplication
 )
 from PyQt5.QtCore import Qt, pyqtSignal
-import pyrebase
-from firebaseConfig import firebaseConfig
+from Backend.Clients import firebase_app
 from cryptography.fernet import Fernet
 
-firebase = pyrebase.initialize_app(firebaseConfig)
+firebase = firebase_app()
 auth = firebase.auth()
 db = firebase.database()
 
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, request, jsonify, render_template_string, Response, stream_with_context
 from flask_cors import CORS
 import os
 import json
@@ -14,24 +14,25 @@ import razorpay
 import hmac
 import hashlib
 from datetime import datetime, timedelta
+from dotenv import dotenv_values
 
 # Import your existing modules
 try:
     from Backend.Model import FirstLayerDMM
-    from Backend.RealTimeSearchEngine import RealtimeSearchEngine  
-    from Backend.Chatbot import ChatBot
+    from Backend.RealTimeSearchEngine import RealtimeSearchEngine, RealtimeSearchEngineStream, RealtimeConcurrency
+    from Backend.Chatbot import ChatBot, ChatBotBatch, ChatBotStream
     from Backend.ImageGenration import generate_image
     from Backend.Memory import remember as remember_memory, forget as forget_memory, set_preference as set_pref
     from Backend.Automation import Automation
+    from Backend.AsyncLoop import backend_loop
 except ImportError as e:
     print(f"Import error: {e}")
     print("Make sure your Backend modules are in the correct path")
 
 # Firebase imports
 try:
-    import pyrebase
-    from firebaseConfig import firebaseConfig
-    firebase = pyrebase.initialize_app(firebaseConfig)
+    from Backend.Clients import firebase_app
+    firebase = firebase_app()
     auth = firebase.auth()
     db = firebase.database()
     FIREBASE_AVAILABLE = True
@@ -48,6 +49,9 @@ RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "your_secret")
 
 razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
 
+# Same switch as the desktop app: answer several general queries in one LLM call
+BATCH_GENERAL = str(dotenv_values(".env").get("BatchGeneral", "True")).strip().lower() == "true"
+
 # Global variables
 executor = ThreadPoolExecutor(max_workers=4)
 active_sessions = {}
@@ -127,21 +131,32 @@ async def process_automation(decisions):
         return f"Automation failed: {str(e)}"
 
 async def process_realtime(queries):
-    """Process real-time queries"""
-    results = []
-    for query in queries:
+    """Process real-time queries in parallel, at most RealtimeConcurrency at a time"""
+    slots = asyncio.Semaphore(RealtimeConcurrency)
+
+    async def one(query):
         try:
-            result = await asyncio.wait_for(
-                asyncio.to_thread(RealtimeSearchEngine, query),
-                timeout=60
-            )
-            results.append(result)
+            async with slots:
+                return await asyncio.wait_for(
+                    asyncio.to_thread(RealtimeSearchEngine, query),
+                    timeout=60
+                )
         except Exception as e:
-            results.append(f"Real-time query failed: {str(e)}")
-    return results
+            return f"Real-time query failed: {str(e)}"
+
+    return await asyncio.gather(*[one(q) for q in queries])
 
 async def process_general(queries):
     """Process general chat queries"""
+    if BATCH_GENERAL and len(queries) > 1:
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(ChatBotBatch, queries),
+                timeout=45 + 15 * len(queries)
+            )
+        except Exception as e:
+            return [f"General query failed: {str(e)}" for _ in queries]
+
     results = []
     for query in queries:
         try:
@@ -229,39 +244,20 @@ def chat_endpoint():
                 "type": "exit"
             })
         
-        # Process tasks asynchronously
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # Process tasks on the shared backend loop; every bucket is submitted before any is awaited
+        processors = {
+            "automation": process_automation,
+            "realtime": process_realtime,
+            "general": process_general,
+            "images": process_images,
+        }
+        futures = {name: backend_loop.submit(process(buckets[name]))
+                   for name, process in processors.items() if buckets[name]}
         
-        try:
-            # Process different types of tasks
-            automation_result = None
-            realtime_results = []
-            general_results = []
-            image_results = []
-            
-            if buckets["automation"]:
-                automation_result = loop.run_until_complete(
-                    process_automation(buckets["automation"])
-                )
-            
-            if buckets["realtime"]:
-                realtime_results = loop.run_until_complete(
-                    process_realtime(buckets["realtime"])
-                )
-            
-            if buckets["general"]:
-                general_results = loop.run_until_complete(
-                    process_general(buckets["general"])
-                )
-            
-            if buckets["images"]:
-                image_results = loop.run_until_complete(
-                    process_images(buckets["images"])
-                )
-            
-        finally:
-            loop.close()
+        automation_result = futures["automation"].result() if "automation" in futures else None
+        realtime_results = futures["realtime"].result() if "realtime" in futures else []
+        general_results = futures["general"].result() if "general" in futures else []
+        image_results = futures["images"].result() if "images" in futures else []
         
         # Combine results
         response_parts = []
@@ -297,6 +293,50 @@ def chat_endpoint():
             "type": "error"
         }), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream_endpoint():
+    """Stream a general or realtime answer as server-sent events"""
+    data = request.json
+    user_id = data.get('user_id', 'anonymous')
+    message = data.get('message', '').strip()
+
+    if not message:
+        return jsonify({"error": "No message provided"}), 400
+
+    try:
+        decisions = FirstLayerDMM(message)
+    except Exception as e:
+        return jsonify({"error": f"Sorry, I couldn't process that: {str(e)}", "type": "error"}), 500
+
+    buckets = parse_decisions(decisions)
+
+    # Only a single general/realtime question can be streamed; everything else goes through /api/chat.
+    if len(decisions) != 1 or not (buckets["general"] or buckets["realtime"]):
+        return jsonify({"type": "redirect", "endpoint": "/api/chat"}), 409
+
+    # Only an accepted stream becomes part of the conversation.
+    session = get_session(user_id)
+    session.add_message("user", message)
+
+    if buckets["general"]:
+        source = ChatBotStream(buckets["general"][0])
+    else:
+        source = RealtimeSearchEngineStream(buckets["realtime"][0])
+
+    def events():
+        answer = ""
+        try:
+            for delta in source:
+                answer += delta
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+        except Exception as e:
+            traceback.print_exc()
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        session.add_message("assistant", answer.strip())
+        yield f"data: {json.dumps({'done': True, 'response': answer.strip()})}\n\n"
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream")
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """Handle file uploads"""
@@ -16,23 +16,5 @@ if not os.path.exists("Data"):
 if not os.path.exists("Frontend/Files"):
     os.makedirs("Frontend/Files", exist_ok=True)
 
-# Initialize default status files
-def initialize_status_files():
-    """Initialize default status files if they don't exist"""
-    files_dir = "Frontend/Files"
-    
-    default_files = {
-        "Status.data": "Available...",
-        "Mic.data": "False", 
-        "Responses.data": "",
-        "UserQuery.data": ""
-    }
-    
-    for filename, default_content in default_files.items():
-        filepath = os.path.join(files_dir, filename)
-        if not os.path.exists(filepath):
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(default_content)
-
-# Call initialization
-initialize_status_files()
\ No newline at end of file
+# Status, responses, mic state and typed queries live on Backend.EventBus;
+# Frontend/Files only holds the remaining data files.
@@ -3,7 +3,6 @@ from Frontend.Gui import (
     GraphicalUserInterface,
     SetAssistantStatus,
     ShowTextToScreen,
-    TempDirectoryPath,
     SetMicrophoneStatus,
     AnswerModifier,
     QueryModifier,
@@ -14,11 +13,16 @@ from Frontend.Gui import (
 from Frontend.LoginScreen import LoginWindow, has_valid_token
 from PyQt5.QtWidgets import QApplication, QMessageBox
 from PyQt5.QtCore import QTimer, pyqtSignal
-from Backend.Model import FirstLayerDMM
-from Backend.RealTimeSearchEngine import RealtimeSearchEngine
+from Backend.Model import FirstLayerDMMStream, decision_cache
+from Backend.IntentMatcher import peek_intent
+from Backend.Streaming import iterate_in_thread
+from Backend.EventBus import bus, USER_QUERY
+from Backend.AsyncLoop import backend_loop
+from Backend.RealTimeSearchEngine import RealtimeSearchEngineAsync, RealtimeConcurrency
+from Backend.Prefetch import prefetcher
 from Backend.Automation import Automation
 from Backend.SpeechToText import SpeechRecognition
-from Backend.Chatbot import ChatBot
+from Backend.Chatbot import ChatBotAsync, ChatBotBatchAsync, SpeculativeAnswer
 from Backend.TextToSpeech import TextToSpeech
 from Backend.ImageGenration import generate_image, generate_multiple_images
 from Backend.Memory import remember as remember_memory, forget as forget_memory, set_preference as set_pref
@@ -27,7 +31,7 @@ from config import TOKEN_FILE
 import config
 from langdetect import detect
 from dotenv import dotenv_values
-from asyncio import run, get_event_loop, to_thread, gather, wait_for, TimeoutError, new_event_loop, set_event_loop
+from asyncio import to_thread, gather, wait_for, TimeoutError, create_task, Semaphore, Queue
 from time import sleep
 import subprocess
 import numpy as np
@@ -40,9 +44,8 @@ import sys
 import signal
 
 # Firebase
-import pyrebase
-from firebaseConfig import firebaseConfig
-firebase = pyrebase.initialize_app(firebaseConfig)
+from Backend.Clients import firebase_app
+firebase = firebase_app()
 db = firebase.database()
 
 # ---------------------- Env & constants ----------------------
@@ -51,6 +54,16 @@ Assistantname = env_vars.get("Assistantname", "Assistant")
 
 AUTOMATION_FUNCS = {"open", "close", "play", "system", "content", "google search", "youtube search"}
 REALTIME_KEYWORDS = ["today", "current", "latest", "breaking", "recent", "now", "weather", "price", "score", "update"]
+SPECULATIVE_GENERAL = str(env_vars.get("SpeculativeGeneral", "True")).strip().lower() == "true"
+BATCH_GENERAL = str(env_vars.get("BatchGeneral", "True")).strip().lower() == "true"
+PREDICTIVE_PREFETCH = str(env_vars.get("PredictivePrefetch", "True")).strip().lower() == "true"
+# Per-bucket deadlines (seconds) on top of the per-query timeouts inside each runner
+BUCKET_DEADLINES = {
+    "automation": float(env_vars.get("AutomationDeadline") or 65),
+    "realtime": float(env_vars.get("RealtimeDeadline") or 75),
+    "general": float(env_vars.get("GeneralDeadline") or 90),
+    "images": float(env_vars.get("ImagesDeadline") or 120),
+}
 WAKE_WORDS = ["kashi", "काशी", "कासी", "hey assistant", "wake up", "hello ai", "__snap__"]
 
 # Audio settings for snap detection
@@ -194,6 +207,12 @@ def parse_decisions(decisions: list):
     
     return buckets
 
+# ---------------------- Streaming Decisions ----------------------
+async def stream_decisions(query: str):
+    """Yield DMM decisions as they arrive, without blocking the event loop"""
+    async for decision in iterate_in_thread(FirstLayerDMMStream, query):
+        yield decision
+
 # ---------------------- Async Task Runners ----------------------
 async def run_automation(decisions):
     if not decisions:
@@ -213,11 +232,22 @@ async def run_general(queries):
         return []
     
     SetAssistantStatus("Thinking...")
+
+    # Several sub-questions share one completion instead of paying for the history N times
+    if BATCH_GENERAL and len(queries) > 1:
+        try:
+            modified = [QueryModifier(q) for q in queries]
+            return await wait_for(ChatBotBatchAsync(modified), timeout=45 + 15 * len(queries))
+        except TimeoutError:
+            return [f"'{q}' timed out." for q in queries]
+        except Exception as e:
+            traceback.print_exc()
+            return [f"'{q}' failed: {str(e)}" for q in queries]
     
     async def one(q):
         try:
             modified_query = QueryModifier(q)
-            return await wait_for(to_thread(ChatBot, modified_query), timeout=45)
+            return await wait_for(ChatBotAsync(modified_query), timeout=45)
         except TimeoutError:
             return f"'{q}' timed out."
         except Exception as e:
@@ -226,16 +256,30 @@ async def run_general(queries):
     
     return await gather(*[one(q) for q in queries], return_exceptions=True)
 
+async def run_speculative(speculation):
+    """Commit the answer that SpeculativeAnswer started before classification finished"""
+    SetAssistantStatus("Thinking...")
+    try:
+        answer = await to_thread(speculation.result, 45)
+        return [answer] if answer else []
+    except TimeoutError:
+        return [f"'{speculation.query}' timed out."]
+    except Exception as e:
+        traceback.print_exc()
+        return [f"'{speculation.query}' failed: {str(e)}"]
+
 async def run_realtime(queries):
     if not queries:
         return []
     
     SetAssistantStatus("Searching...")
+    slots = Semaphore(RealtimeConcurrency)
     
     async def one(q):
         try:
             modified_query = QueryModifier(q)
-            return await wait_for(to_thread(RealtimeSearchEngine, modified_query), timeout=60)
+            async with slots:
+                return await wait_for(RealtimeSearchEngineAsync(modified_query), timeout=60)
         except TimeoutError:
             return f"'{q}' timed out."
         except Exception as e:
@@ -262,24 +306,31 @@ async def run_images(prompts):
     
     return await gather(*[one(p, i) for i, p in enumerate(prompts)], return_exceptions=True)
 
+async def with_deadline(name, coro):
+    """Run one bucket's work, giving up once the bucket's deadline passes"""
+    try:
+        return await wait_for(coro, timeout=BUCKET_DEADLINES[name])
+    except TimeoutError:
+        print(f"{name} bucket missed its {BUCKET_DEADLINES[name]:g}s deadline")
+        if name == "automation":
+            return "Automation timed out."
+        return [] if name == "images" else [f"The {name} part of your request timed out."]
+
+def answer_pieces(answers):
+    """Displayable answers out of one runner's result"""
+    if not isinstance(answers, list):
+        answers = [answers]
+    parts = []
+    for a in answers:
+        if a and not isinstance(a, Exception):
+            modified = AnswerModifier(str(a))
+            if modified:
+                parts.append(str(modified))
+    return parts
+
 def merge_answers(realtime_answers, general_answers):
     """Merge answers from different sources"""
-    parts = []
-    
-    if realtime_answers:
-        for a in realtime_answers:
-            if a and not isinstance(a, Exception):
-                modified = AnswerModifier(str(a))
-                if modified:
-                    parts.append(str(modified))
-    
-    if general_answers:
-        for a in general_answers:
-            if a and not isinstance(a, Exception):
-                modified = AnswerModifier(str(a))
-                if modified:
-                    parts.append(str(modified))
-    
+    parts = answer_pieces(realtime_answers or []) + answer_pieces(general_answers or [])
     return "\n\n".join(parts).strip()
 
 # ---------------------- TTS Wrapper ----------------------
@@ -310,54 +361,133 @@ def MainExecution(Query: str, lang="en"):
         ShowTextToScreen(f'{username} : {Query}')
         SetAssistantStatus("Thinking...")
 
-        # Get decisions from AI
-        try:
-            decisions = FirstLayerDMM(Query)
-        except Exception as e:
-            traceback.print_exc()
-            error_msg = f"Sorry, I couldn't process that: {str(e)}"
-            ShowTextToScreen(f"{Assistantname} : {error_msg}")
-            safe_tts("Sorry, I couldn't process that request.", lang)
-            return True
+        # Answers already shown and spoken while other buckets were still running
+        shown = []
 
-        if not decisions:
-            error_msg = "I'm not sure how to help with that."
-            ShowTextToScreen(f"{Assistantname} : {error_msg}")
-            safe_tts(error_msg, lang)
-            return True
+        # Orchestrate async tasks, launching each one as soon as the classifier emits it
+        async def orchestrate():
+            speech = Queue()
 
-        buckets = parse_decisions(decisions)
+            async def speak():
+                # One answer at a time, in the order they finished
+                while True:
+                    text = await speech.get()
+                    if text is None:
+                        return
+                    await to_thread(safe_tts, text, lang)
 
-        if buckets["exit"]:
-            farewell = "Okay, bye!"
-            ShowTextToScreen(f"{Assistantname} : {farewell}")
-            safe_tts(farewell, lang)
-            cleanup_and_exit()
+            speaker = create_task(speak())
+            try:
+                return await run_buckets(speech)
+            finally:
+                speech.put_nowait(None)
+                await speaker
+
+        async def run_buckets(speech):
+            runners = {
+                "automation": run_automation,
+                "realtime": run_realtime,
+                "general": run_general,
+                "images": run_images,
+            }
+            tasks = {name: [] for name in runners}
+            decisions = []
+
+            def emit(task):
+                # Show and speak an answer as soon as its bucket finishes, not after the slowest one
+                if task.cancelled() or task.exception():
+                    return
+                for piece in answer_pieces(task.result()):
+                    shown.append(piece)
+                    ShowTextToScreen(f"{Assistantname} : {piece}")
+                    speech.put_nowait(piece)
+
+            def launch(name, coro):
+                task = create_task(with_deadline(name, coro))
+                if name in ("realtime", "general"):
+                    task.add_done_callback(emit)
+                tasks[name].append(task)
+
+            # Most queries end up as a single 'general' decision, so start answering
+            # the raw query right away and keep it only if the DMM agrees. Queries the
+            # fast path or the decision cache resolve instantly ("volume up", "bye") never
+            # reach the DMM, so speculating on them would only waste an LLM call.
+            speculate = SPECULATIVE_GENERAL and not peek_intent(Query) and not decision_cache.peek(Query)
+            speculation = SpeculativeAnswer(QueryModifier(Query)) if speculate else None
+            held_general = None
+
+            # With batching, general sub-queries are collected and answered in one call at the end
+            pending_general = []
+
+            def dispatch_general(queries):
+                if BATCH_GENERAL:
+                    pending_general.extend(queries)
+                else:
+                    launch("general", run_general(queries))
 
-        # Orchestrate async tasks
-        async def orchestrate():
+            try:
+                async for decision in stream_decisions(Query):
+                    decisions.append(decision)
+                    parsed = parse_decisions([decision])
+                    if parsed["exit"]:
+                        for pending in tasks.values():
+                            for task in pending:
+                                task.cancel()
+                        if speculation:
+                            speculation.cancel()
+                        return "exit", None
+
+                    # Anything but a lone general decision invalidates the speculative answer.
+                    if speculation and (len(decisions) > 1 or not parsed["general"]):
+                        speculation.cancel()
+                        speculation = None
+                        if held_general:
+                            dispatch_general(held_general)
+                            held_general = None
+                    if speculation:
+                        held_general, parsed["general"] = parsed["general"], []
+                    if parsed["general"]:
+                        dispatch_general(parsed["general"])
+                        parsed["general"] = []
+
+                    for name, runner in runners.items():
+                        if parsed[name]:
+                            launch(name, runner(parsed[name]))
+            except Exception as e:
+                traceback.print_exc()
+                if not decisions:
+                    if speculation:
+                        speculation.cancel()
+                    return "error", str(e)
+
+            if speculation and held_general:
+                launch("general", run_speculative(speculation))
+            elif speculation:
+                speculation.cancel()
+            if pending_general:
+                launch("general", run_general(pending_general))
+
+            if not decisions:
+                return "empty", None
+
+            # Every bucket is already running; collect them in a fixed order so the
+            # merged answer saved to history doesn't depend on which finished first
             results = {}
-            
-            # Run tasks concurrently where possible
-            tasks = []
-            
-            if buckets["automation"]:
-                tasks.append(("automation", run_automation(buckets["automation"])))
-            if buckets["realtime"]:
-                tasks.append(("realtime", run_realtime(buckets["realtime"])))
-            if buckets["general"]:
-                tasks.append(("general", run_general(buckets["general"])))
-            if buckets["images"]:
-                tasks.append(("images", run_images(buckets["images"])))
-            
-            # Wait for all tasks
-            for task_name, task_coro in tasks:
-                try:
-                    results[task_name] = await task_coro
-                except Exception as e:
-                    print(f"Error in {task_name} task: {e}")
-                    results[task_name] = f"Error in {task_name}: {str(e)}"
-            
+            for task_name, pending in tasks.items():
+                if not pending:
+                    continue
+                outputs = await gather(*pending, return_exceptions=True)
+                for out in outputs:
+                    if isinstance(out, Exception):
+                        print(f"Error in {task_name} task: {out}")
+                        out = f"Error in {task_name}: {str(out)}"
+                    if task_name == "automation":
+                        results[task_name] = results.get(task_name) or out
+                    elif isinstance(out, list):
+                        results.setdefault(task_name, []).extend(out)
+                    else:
+                        results.setdefault(task_name, []).append(out)
+
             # Merge answers
             combined = merge_answers(
                 results.get("realtime", []), 
@@ -373,30 +503,40 @@ def MainExecution(Query: str, lang="en"):
                 if image_results:
                     combined += "\n\n" + "\n".join(image_results)
             
-            return combined
+            return "ok", combined
 
-        # Run the orchestration
+        # Run the orchestration on the shared backend loop, where the async clients stay warm
         try:
-            # Get or create event loop
-            try:
-                loop = get_event_loop()
-                if loop.is_closed():
-                    raise RuntimeError("Event loop is closed")
-            except RuntimeError:
-                loop = new_event_loop()
-                set_event_loop(loop)
-
-            final_answer = loop.run_until_complete(orchestrate())
+            outcome, final_answer = backend_loop.run(orchestrate())
             
         except Exception as e:
             traceback.print_exc()
-            final_answer = f"Something went wrong while processing tasks: {str(e)}"
+            outcome, final_answer = "ok", f"Something went wrong while processing tasks: {str(e)}"
+
+        if outcome == "error":
+            error_msg = f"Sorry, I couldn't process that: {final_answer}"
+            ShowTextToScreen(f"{Assistantname} : {error_msg}")
+            safe_tts("Sorry, I couldn't process that request.", lang)
+            return True
+
+        if outcome == "empty":
+            error_msg = "I'm not sure how to help with that."
+            ShowTextToScreen(f"{Assistantname} : {error_msg}")
+            safe_tts(error_msg, lang)
+            return True
+
+        if outcome == "exit":
+            farewell = "Okay, bye!"
+            ShowTextToScreen(f"{Assistantname} : {farewell}")
+            safe_tts(farewell, lang)
+            cleanup_and_exit()
 
         # Process and display final answer
         final_answer = AnswerModifier(str(final_answer or ""))
         if final_answer and final_answer.strip():
-            ShowTextToScreen(f"{Assistantname} : {final_answer}")
-            safe_tts(final_answer, lang)
+            if not shown:
+                ShowTextToScreen(f"{Assistantname} : {final_answer}")
+                safe_tts(final_answer, lang)
 
             # Save to Firebase history
             try:
@@ -586,38 +726,24 @@ def FirstThread():
 
     print("Voice thread shutting down")
 
-# ---------------------- Query File Monitor ----------------------
+# ---------------------- Query Monitor ----------------------
 def monitor_user_query():
-    """Monitor for text input from GUI"""
-    query_file = TempDirectoryPath("UserQuery.data")
-    last_modified = 0
-    
+    """Process text typed into the GUI as it is published on the event bus"""
     print("Query monitor thread started")
     
     while not shutdown_event.is_set():
         try:
-            if os.path.exists(query_file):
-                current_modified = os.path.getmtime(query_file)
-                if current_modified > last_modified:
-                    last_modified = current_modified
-                    
-                    with open(query_file, "r", encoding="utf-8") as f:
-                        query = f.read().strip()
-                    
-                    if query:
-                        # Clear the file
-                        with open(query_file, "w", encoding="utf-8") as f:
-                            f.write("")
-                        
-                        # Process the query
-                        try:
-                            lang_code = detect(query) if current_tts_lang == "en" else current_tts_lang
-                        except:
-                            lang_code = current_tts_lang
-                            
-                        MainExecution(query, lang=lang_code)
+            # Wake on the next typed query; the timeout only lets shutdown be noticed
+            query = bus.take(USER_QUERY, timeout=0.5)
+            query = (query or "").strip()
             
-            sleep(0.1)  # Check every 100ms
+            if query:
+                try:
+                    lang_code = detect(query) if current_tts_lang == "en" else current_tts_lang
+                except:
+                    lang_code = current_tts_lang
+                    
+                MainExecution(query, lang=lang_code)
             
         except Exception as e:
             print(f"Query monitor error: {e}")
@@ -648,6 +774,12 @@ def cleanup_and_exit():
     except Exception as e:
         print(f"Error cleaning up speech recognition: {e}")
     
+    # Stop the backend event loop and close its connections
+    try:
+        backend_loop.stop()
+    except Exception as e:
+        print(f"Error stopping backend loop: {e}")
+    
     # Close GUI
     if gui_app:
         try:
@@ -715,6 +847,10 @@ def main():
         except Exception as e:
             print(f"Error starting query thread: {e}")
         
+        # Answer habitual realtime questions shortly before they are usually asked
+        if PREDICTIVE_PREFETCH:
+            prefetcher.start()
+        
         # Close login window if it exists
         if login_window:
             try: